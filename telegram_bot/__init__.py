@@ -1,19 +1,39 @@
 
-import io, os, traceback, re
+import io, os, traceback, re, threading
 import pandas as pd
 import numpy as np
 from apscheduler.schedulers.background import BackgroundScheduler
 from pytz import utc as TZ_UTC
 from telegram.ext import CommandHandler, MessageHandler, Filters, CallbackQueryHandler
 from telegram import ParseMode, InlineKeyboardMarkup, InlineKeyboardButton, Bot
+from telegram.error import BadRequest
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from . import montecarlo
+from .dataset import load_dataset, _utc_naive
+from .resample import pyramid, time_profile
+from .grouping import factorize, group_stats, top_n, bincount2d
+from .correlation import daily_corr, top_pairs
+from .fills import fill_columns, reconstruct
+from . import projection
+from .sketch import SKETCHES
+from . import whatif
+from .metrics import summarize, fmt_metric, METRIC_LABELS, walk_forward
+from . import compare
+from . import batch
+from . import holding
+from . import sessions
+from .chartcache import CHART_CACHE, chart_key
+from .fileids import FILE_IDS
+from .render import figure, to_png
+from .downsample import minmax
+from . import charts, chartpool
+from .chartpool import ChartError
 
 TRADES_PATH = os.environ.get("TRADES_PATH", "trades.csv")
+BATCH_DIR = os.environ.get("BATCH_DIR", "backtests")
 DIGEST_FILE = "digest_chat.txt"
 DIGEST_TIME_FILE = "digest_time.txt"
+PRERENDER_LEAD_MIN = int(os.environ.get("PRERENDER_LEAD_MIN", "5"))
 
 # ---------------- Scheduler (UTC) ----------------
 scheduler = BackgroundScheduler(daemon=True, timezone=TZ_UTC)
@@ -23,6 +43,7 @@ def start_scheduler():
         return
     _schedule_digest()
     scheduler.start()
+    chartpool.warm()
 
 def _schedule_digest():
     try:
@@ -49,6 +70,9 @@ def _schedule_digest():
     scheduler.add_job(lambda: _send_digest(bot, chat_id),
                       trigger='cron', hour=hour, minute=minute,
                       id='daily_digest', replace_existing=True, timezone=TZ_UTC)
+    lead = (hour * 60 + minute - PRERENDER_LEAD_MIN) % 1440
+    scheduler.add_job(_prerender, trigger='cron', hour=lead // 60, minute=lead % 60,
+                      id='digest_prerender', replace_existing=True, timezone=TZ_UTC)
 
 def _send_digest(bot: Bot, chat_id: str):
     try:
@@ -57,10 +81,23 @@ def _send_digest(bot: Bot, chat_id: str):
     except Exception as e:
         print("Digest send error:", e)
 
+def _prerender():
+    """Fill the chart cache with the most requested charts (equity, drawdown, daily, default heatmap, report)."""
+    try:
+        ds = load_dataset(TRADES_PATH)
+        if ds is None or not ds.pcol:
+            return
+        for mode in ("equity", "dd", "daily"):
+            _cached_graph(ds, mode)
+        _cached_heatmap(ds, {})
+        _report_png(ds, ds.df, ds.pcol, ds.scol)
+    except Exception as e:
+        print("Prerender warning:", e)
+
 # ---------------- CSV helpers ----------------
 PROFIT_CANDIDATES = [
     "pnl","profit","pl","p&l","net_pnl","netpnl","net-profit","netprofit",
-    "return","returns","roi","netp&l","gross_pnl","grosspnl","net"
+    "return","returns","roi","netp&l","gross_pnl","grosspnl","net","realized_pnl"
 ]
 TIME_CANDIDATES = [
     "time","timestamp","date","datetime","open_time","close_time",
@@ -78,6 +115,22 @@ def _read_csv_safely(path: str) -> pd.DataFrame:
             continue
     return pd.DataFrame()
 
+def _load_trades(path: str) -> pd.DataFrame:
+    # shared frame of the cached Dataset for the file's current version: treat as read-only
+    ds = load_dataset(path)
+    return ds.df if ds is not None else pd.DataFrame()
+
+def _parse_trades(path: str) -> pd.DataFrame:
+    # raw fills without a PnL column are matched into closing trades (realized_pnl)
+    df = _read_csv_safely(path)
+    if df.empty or any(str(c).strip().lower() in PROFIT_CANDIDATES for c in df.columns):
+        return df
+    cols = fill_columns(df)
+    if cols is None:
+        return df
+    closes, _ = reconstruct(df, *cols, tcol=_auto_time_col(df), scol=_auto_symbol_col(df))
+    return closes
+
 def _auto_profit_col(df: pd.DataFrame):
     for name in PROFIT_CANDIDATES:
         for c in df.columns:
@@ -150,7 +203,7 @@ def _drawdown(equity: pd.Series) -> pd.Series:
     dd = equity - peak
     return dd
 
-def _summary_html(df: pd.DataFrame, pcol: str):
+def _summary_lines(df: pd.DataFrame, pcol: str):
     r = pd.to_numeric(df[pcol], errors="coerce").fillna(0.0).astype(float)
     total = int(r.shape[0])
     pnl = float(r.sum())
@@ -166,10 +219,13 @@ def _summary_html(df: pd.DataFrame, pcol: str):
         f"Avg      : {avg:>8.2f}",
         f"Best/Wst : {best:>8.2f} | {worst:>8.2f}",
     ]
-    return "<b>📊 Performance</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    return lines
+
+def _summary_html(df: pd.DataFrame, pcol: str):
+    return "<b>📊 Performance</b>\n<pre>" + "\n".join(_summary_lines(df, pcol)) + "</pre>"
 
 def _build_summary_digest():
-    df = _read_csv_safely(TRADES_PATH)
+    df = _load_trades(TRADES_PATH)
     if df.empty:
         return "<b>📊 Daily Digest</b>\n<pre>No trades</pre>"
     pcol = _auto_profit_col(df)
@@ -177,22 +233,24 @@ def _build_summary_digest():
         return "<b>📊 Daily Digest</b>\n<pre>No profit column</pre>"
     return _summary_html(df, pcol).replace("📊 Performance", "📊 Daily Digest")
 
+def _perfs_lines(df: pd.DataFrame, pcol: str, scol: str, top: int = 10):
+    if scol and scol in df.columns:
+        codes, names = factorize(df[scol])
+    else:
+        codes, names = np.zeros(len(df), dtype=np.int64), np.asarray(["ALL"], dtype=object)
+    r = pd.to_numeric(df[pcol], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    st = group_stats(codes, r, len(names))
+    lines = ["Symbol Performance"]
+    lines.append(f"{'Symbol':<10} {'Trades':>6} {'PnL':>10} {'Win%':>7} {'Avg':>9} {'PF':>5} {'MaxDD':>9} {'Best':>9}")
+    for i in top_n(st["pnl"], top, present=st["count"] > 0):
+        pf = "inf" if np.isinf(st["pf"][i]) else f"{st['pf'][i]:.2f}"
+        lines.append(f"{str(names[i])[:10]:<10} {int(st['count'][i]):>6d} {st['pnl'][i]:>10.2f} {st['win_pct'][i]:>6.2f}% {st['avg'][i]:>9.2f} {pf:>5} {st['maxdd'][i]:>9.2f} {st['best'][i]:>9.2f}")
+    return lines
+
 def _perfs_table(df: pd.DataFrame, pcol: str, scol: str, top: int = 10) -> str:
     if not pcol:
         return "<i>No profit column.</i>"
-    if not scol or scol not in df.columns:
-        df = df.copy()
-        df["__ALL__"] = "ALL"
-        scol = "__ALL__"
-    g = df.groupby(scol)[pcol]
-    total = g.count(); pnl = g.sum(); avg = g.mean()
-    win = df.assign(win=(pd.to_numeric(df[pcol], errors='coerce')>0).astype(int)).groupby(scol)['win'].mean()*100.0
-    out = pd.DataFrame({"Trades": total, "PnL": pnl, "Win%": win, "Avg": avg}).fillna(0.0).sort_values("PnL", ascending=False).head(top)
-    lines = ["Symbol Performance"]
-    lines.append(f"{'Symbol':<10} {'Trades':>6} {'PnL':>10} {'Win%':>7} {'Avg':>9}")
-    for idx, r in out.iterrows():
-        lines.append(f"{str(idx)[:10]:<10} {int(r['Trades']):>6d} {float(r['PnL']):>10.2f} {float(r['Win%']):>6.2f}% {float(r['Avg']):>9.2f}")
-    return "<pre>" + "\n".join(lines) + "</pre>"
+    return "<pre>" + "\n".join(_perfs_lines(df, pcol, scol, top)) + "</pre>"
 
 def _top_drawdowns(r: pd.Series, tvals: pd.Series = None, top=5):
     eq = r.cumsum()
@@ -266,11 +324,23 @@ def _help_html():
         "<b>📘 Commands</b>\n"
         "• <b>/summary</b> [symbol=BTC timeframe=7d]\n"
         "• <b>/perfs</b> [top=10]\n"
-        "• <b>/graph</b> [daily|dd] [symbol=BTC]\n"
-        "• <b>/heatmap</b> [weekday=1]\n"
+        "• <b>/graph</b> [daily|weekly|monthly|dd] [symbol=BTC]\n"
+        "• <b>/heatmap</b> [layout=date|hour|month] [weekday=1]\n"
         "• <b>/topdrawdown</b> [top=5]\n"
         "• <b>/beststreak</b>\n"
-        "• <b>/report</b> — one-shot summary + chart\n"
+        "• <b>/report</b> — one-shot summary + composite chart (<code>album</code> for separate photos)\n"
+        "• <b>/montecarlo</b> [runs=10000 block=20]\n"
+        "• <b>/correlation</b> [timeframe=90d top=20]\n"
+        "• <b>/positions</b> — open exposure from raw fills\n"
+        "• <b>/distribution</b> [symbol=BTC]\n"
+        "• <b>/timeprofile</b> [symbol=BTC timeframe=90d]\n"
+        "• <b>/compare</b> [names…] [sort=pnl|pf|maxdd|sharpe]\n"
+        "• <b>/batch</b> [path=backtests sort=pnl top=20] — or send a .zip of CSVs\n"
+        "• <b>/walkforward</b> [folds=5 train=1]\n"
+        "• <b>/holding</b> [symbol=BTC]\n"
+        "• <b>/sessions</b> [gap=2h]\n"
+        "• <b>/whatif</b> [exclude=DOGE,SHIB hours=8-20 fee=0.05% slippage=2bp maxloss=50 chart=1]\n"
+        "• <b>/project</b> amount=1000 days=30 daily=2 | pertrade=1 trades=5 (lists/ranges sweep)\n"
         "• <b>/digest on|off</b> • <b>/digesttime HH:MM</b> • <b>/digeststatus</b>\n"
         "• <b>/columns</b> • <b>/trades</b> • <b>/status</b> • <b>/samplecsv</b>\n"
         "<i>Tip: send new CSV to replace <code>trades.csv</code>.</i>"
@@ -280,37 +350,79 @@ def _help_html():
 def _parse_args(args_text: str):
     out = {}
     if args_text:
-        for part in re.split(r"\\s+", args_text.strip()):
+        for part in re.split(r"\s+", args_text.strip()):
             if "=" in part:
                 k,v = part.split("=", 1)
                 out[k.strip().lower()] = v.strip()
     return out
 
+WEEKDAYS = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
+
+def _timeframe_delta(tf):
+    m = re.match(r"^(\d+)\s*([dhwmy])$", (tf or "").strip().lower())
+    if not m:
+        return None
+    n = int(m.group(1)); unit = m.group(2)
+    if unit == "d": return pd.Timedelta(days=n)
+    if unit == "h": return pd.Timedelta(hours=n)
+    if unit == "w": return pd.Timedelta(weeks=n)
+    if unit == "m": return pd.Timedelta(days=30*n)
+    return pd.Timedelta(days=365*n)
+
+def _parse_weekday(val):
+    # 1=Mon .. 7=Sun (0 also means Sun) or a day name; returns 0=Mon .. 6=Sun
+    v = (val or "").strip().lower()
+    if v.isdigit() and 0 <= int(v) <= 7:
+        return (int(v) - 1) % 7
+    for i, name in enumerate(WEEKDAYS):
+        if v[:3] == name.lower():
+            return i
+    return None
+
 def _apply_filters(df: pd.DataFrame, args: dict, tcol: str, scol: str):
     if "symbol" in args and scol in df.columns:
         want = args["symbol"].strip().upper()
         df = df[df[scol].astype(str).str.upper() == want]
-    if "timeframe" in args and tcol in df.columns:
-        tf = args["timeframe"].strip().lower()
-        now = pd.Timestamp.now(tz=None)
-        delta = None
-        m = re.match(r"^(\\d+)\\s*([dhwmy])$", tf)
-        if m:
-            n = int(m.group(1)); unit = m.group(2)
-            if unit == "d": delta = pd.Timedelta(days=n)
-            elif unit == "h": delta = pd.Timedelta(hours=n)
-            elif unit == "w": delta = pd.Timedelta(weeks=n)
-            elif unit == "m": delta = pd.Timedelta(days=30*n)
-            elif unit == "y": delta = pd.Timedelta(days=365*n)
+    delta = _timeframe_delta(args.get("timeframe"))
+    wd = _parse_weekday(args.get("weekday"))
+    if (delta is not None or wd is not None) and tcol in df.columns:
+        # UTC-naive like load_dataset, so tz-aware exports compare against a naive "now"
+        tvals = _utc_naive(pd.to_datetime(_parse_maybe_datetime(df[tcol]), errors="coerce"))
         if delta is not None:
-            cutoff = now - delta
-            tvals = _parse_maybe_datetime(df[tcol])
-            df = df[tvals >= cutoff]
+            df = df[(tvals >= pd.Timestamp.now(tz=None) - delta).to_numpy()]
+            tvals = tvals[df.index]
+        if wd is not None:
+            df = df[(tvals.dt.dayofweek == wd).to_numpy()]
     return df
 
+def _filter_mask(ds, args: dict):
+    # array counterpart of _apply_filters for cached datasets
+    m = ds.symbol_mask(args.get("symbol"))
+    delta = _timeframe_delta(args.get("timeframe"))
+    if delta is not None:
+        cutoff = (pd.Timestamp.now(tz=None) - delta).value // 10**9
+        m = m & ds.tvalid & (ds.epoch >= cutoff)
+    wd = _parse_weekday(args.get("weekday"))
+    if wd is not None:
+        m = m & ds.tvalid & (ds.weekday == wd)
+    return m
+
+def _timeframe_bucket(tf) -> str:
+    # relative windows move with the clock: the cutoff rounded to the timeframe's own unit (hour for "h", else day)
+    delta = _timeframe_delta(tf)
+    if delta is None:
+        return ""
+    unit = "h" if (tf or "").strip().lower().endswith("h") else "D"
+    return str((pd.Timestamp.now(tz=None) - delta).floor(unit))
+
+def _filter_key(args: dict) -> tuple:
+    # memo key covering everything _filter_mask reads
+    tf = (args.get("timeframe") or "").strip().lower()
+    return ((args.get("symbol") or "").strip().upper(), tf, _parse_weekday(args.get("weekday")), _timeframe_bucket(tf))
+
 # core commands reused from earlier builds
 def columns_cmd(update, context):
-    df = _read_csv_safely(TRADES_PATH)
+    df = _load_trades(TRADES_PATH)
     if df.empty:
         update.effective_message.reply_text("No CSV loaded."); return
     pcol = _auto_profit_col(df); tcol = _auto_time_col(df); scol = _auto_symbol_col(df)
@@ -331,15 +443,19 @@ def columns_cmd(update, context):
     update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
 
 def status_cmd(update, context):
-    update.effective_message.reply_text(f"TRADES_PATH: {TRADES_PATH}")
+    cs = CHART_CACHE.stats(); ps = chartpool.stats()
+    update.effective_message.reply_text(
+        f"TRADES_PATH: {TRADES_PATH}\n"
+        f"Chart cache: {cs['entries']} charts, {cs['bytes']/1024:.0f}/{cs['max_bytes']/1024:.0f} KB, "
+        f"hit {cs['hit_rate']:.0f}% ({cs['hits']}/{cs['hits']+cs['misses']}), evicted {cs['evictions']}\n"
+        f"file_id reuse: {FILE_IDS.hits} hits / {FILE_IDS.misses} uploads\n"
+        f"Chart pool: {ps['workers']} workers, {ps['in_flight']}/{ps['max_queue']} in flight, "
+        f"{ps['rendered']} rendered, {ps['rejected']} rejected, {ps['timeouts']} timed out")
 
 def trades_cmd(update, context):
     if not os.path.exists(TRADES_PATH):
         update.effective_message.reply_text("No trades file yet."); return
-    with open(TRADES_PATH, "rb") as f:
-        bio = io.BytesIO(f.read())
-    bio.name = os.path.basename(TRADES_PATH)
-    update.effective_message.reply_document(bio, filename=bio.name, caption="Current trades.csv")
+    _send_document(update.effective_message, TRADES_PATH, caption="Current trades.csv")
 
 def samplecsv_cmd(update, context):
     rows = [
@@ -353,13 +469,10 @@ def samplecsv_cmd(update, context):
     with open(tmp, "w") as f:
         for r in rows:
             f.write(",".join(map(str,r))+"\\n")
-    with open(tmp, "rb") as f:
-        bio = io.BytesIO(f.read())
-    bio.name = "sample_trades.csv"
-    update.effective_message.reply_document(bio, filename=bio.name, caption="Sample CSV format")
+    _send_document(update.effective_message, tmp, caption="Sample CSV format")
 
 def summary_cmd(update, context):
-    df = _read_csv_safely(TRADES_PATH)
+    df = _load_trades(TRADES_PATH)
     if df.empty:
         update.effective_message.reply_text("No CSV loaded."); return
     pcol = _auto_profit_col(df)
@@ -369,7 +482,7 @@ def summary_cmd(update, context):
     update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
 
 def perfs_cmd(update, context):
-    df = _read_csv_safely(TRADES_PATH)
+    df = _load_trades(TRADES_PATH)
     if df.empty:
         update.effective_message.reply_text("No CSV loaded."); return
     pcol = _auto_profit_col(df); tcol = _auto_time_col(df); scol = _auto_symbol_col(df)
@@ -381,63 +494,132 @@ def perfs_cmd(update, context):
     html = _perfs_table(df2, pcol, scol, top=int(args.get("top", 10)))
     update.effective_message.reply_text("<b>📈 Per-Symbol</b>\n" + html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
 
+GRAPH_TITLES = {"equity": "Equity curve", "daily": "Daily PnL", "weekly": "Weekly PnL", "monthly": "Monthly PnL", "dd": "Drawdown"}
+
+def _photo(data: bytes, name: str):
+    out = io.BytesIO(data); out.name = name
+    return out
+
+def _send_photo(message, data: bytes, name: str, caption=None, **kw):
+    # identical bytes were uploaded before: resend by file_id, fall back to a fresh upload if Telegram rejects it
+    key = FILE_IDS.key(data, "photo")
+    fid = FILE_IDS.get(key)
+    if fid:
+        try:
+            return message.reply_photo(fid, caption=caption, **kw)
+        except BadRequest:
+            FILE_IDS.drop(key)
+    sent = message.reply_photo(_photo(data, name), caption=caption, **kw)
+    try:
+        FILE_IDS.put(key, sent.photo[-1].file_id)
+    except (AttributeError, IndexError, TypeError):
+        pass
+    return sent
+
+def _send_document(message, path: str, caption=None, **kw):
+    key = FILE_IDS.file_key(path, "document")
+    fid = FILE_IDS.get(key)
+    if fid:
+        try:
+            return message.reply_document(fid, caption=caption, **kw)
+        except BadRequest:
+            FILE_IDS.drop(key)
+    with open(path, "rb") as f:
+        sent = message.reply_document(f, filename=os.path.basename(path), caption=caption, **kw)
+    try:
+        FILE_IDS.put(key, sent.document.file_id)
+    except (AttributeError, TypeError):
+        pass
+    return sent
+
+def _graph_png(ds, mode: str, symbol=None):
+    title = GRAPH_TITLES[mode]
+    if mode in ("daily","weekly","monthly"):
+        series = pyramid(ds, symbol).get({"daily": "day", "weekly": "week", "monthly": "month"}[mode])
+        if series is None:
+            return None
+        x, y = minmax(series["start"], series["pnl"])
+        return chartpool.render(charts.line, x, y, title, "Date", title, True)
+    eq = _equity_curve(pd.Series(ds.pnl[ds.symbol_mask(symbol)]))
+    if mode == "dd":
+        dd = _drawdown(eq)
+        x, y = minmax(dd.index.values, dd.values)
+        return chartpool.render(charts.line, x, y, "Drawdown", "Trade #", "Drawdown")
+    x, y = minmax(eq.index.values, eq.values)
+    return chartpool.render(charts.line, x, y, "Equity Curve", "Trade #", "Equity")
+
+def _cached_graph(ds, mode: str = "equity", symbol=None):
+    key = chart_key(ds.version, "graph", mode=mode, symbol=symbol)
+    return CHART_CACHE.get_or_render(key, lambda: _graph_png(ds, mode, symbol))
+
 def graph_cmd(update, context):
-    df = _read_csv_safely(TRADES_PATH)
-    if df.empty:
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
         update.effective_message.reply_text("No CSV loaded."); return
-    pcol = _auto_profit_col(df); tcol = _auto_time_col(df); scol = _auto_symbol_col(df)
-    if not pcol:
+    if not ds.pcol:
         update.effective_message.reply_text("Couldn't detect profit column. Try /samplecsv."); return
     args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
     mode = "equity"
-    for token in re.split(r"\\s+", args_txt.strip()):
-        if token.lower() in ("daily","dd"):
+    for token in re.split(r"\s+", args_txt.strip()):
+        if token.lower() in ("daily","weekly","monthly","dd"):
             mode = token.lower()
-    m = re.search(r"symbol=([A-Za-z0-9_\\-\\.]+)", args_txt)
-    if m and scol and scol in df.columns:
-        want = m.group(1).upper()
-        df = df[df[scol].astype(str).str.upper() == want]
-    r = pd.to_numeric(df[pcol], errors="coerce").fillna(0.0).astype(float)
-    if mode == "daily" and tcol and tcol in df.columns:
-        tvals = _parse_maybe_datetime(df[tcol])
-        daily = r.groupby(tvals.dt.date).sum()
-        fig = plt.figure(figsize=(8,4)); plt.plot(daily.index.astype(str), daily.values)
-        plt.title("Daily PnL"); plt.xlabel("Date"); plt.ylabel("Daily PnL"); plt.xticks(rotation=45, ha="right")
-    elif mode == "dd":
-        eq = _equity_curve(r); dd = _drawdown(eq)
-        fig = plt.figure(figsize=(8,4)); plt.plot(dd.index.values, dd.values)
-        plt.title("Drawdown"); plt.xlabel("Trade #"); plt.ylabel("Drawdown")
+    symbol = _parse_args(args_txt).get("symbol") if ds.scol else None
+    try:
+        png = _cached_graph(ds, mode, symbol)
+    except ChartError as e:
+        update.effective_message.reply_text(f"⏳ {e}"); return
+    if png is None:
+        update.effective_message.reply_text("No timestamps for this view."); return
+    _send_photo(update.effective_message, png, "graph.png", caption=GRAPH_TITLES[mode])
+
+def _heatmap_png(ds, args: dict):
+    layout = args.get("layout", "date").lower()
+    m = _filter_mask(ds, args) & ds.tvalid
+    if not m.any():
+        return None
+    r = ds.pnl[m]
+    if layout == "hour":
+        rows, cols = ds.hour[m], ds.weekday[m]
+        ylabels, xlabels = [f"{h:02d}" for h in range(24)], WEEKDAYS
+        ylabel, xlabel = "Hour (UTC)", "Weekday"
     else:
-        eq = _equity_curve(r)
-        fig = plt.figure(figsize=(8,4)); plt.plot(eq.index.values, eq.values)
-        plt.title("Equity Curve"); plt.xlabel("Trade #"); plt.ylabel("Equity")
-    plt.tight_layout()
-    out = io.BytesIO(); fig.savefig(out, format="png"); plt.close(fig); out.seek(0); out.name = "graph.png"
-    update.effective_message.reply_photo(out, caption=("Equity curve" if mode=="equity" else ("Daily PnL" if mode=="daily" else "Drawdown")))
+        if layout == "month":
+            b = ds.epoch[m] // 86400
+            b = b.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+            unit, ylabel = "datetime64[M]", "Month"
+        else:
+            b = ds.epoch[m] // 86400
+            unit, ylabel = "datetime64[D]", "Date"
+        lo = int(b.min()); rows = b - lo
+        ylabels = [str(d) for d in np.arange(lo, lo + int(rows.max()) + 1).astype(unit)]
+        syms, cols = np.unique(ds.sym_codes[m], return_inverse=True)
+        xlabels = [str(x) for x in ds.sym_names[syms]]; xlabel = ds.scol or "Symbol"
+    grid = bincount2d(rows, cols, len(ylabels), len(xlabels), r)
+    return chartpool.render(charts.heatmap, grid, xlabels, ylabels, "PnL Heatmap", xlabel, ylabel)
+
+def _cached_heatmap(ds, args: dict):
+    keep = {k: args.get(k) for k in ("layout", "symbol", "timeframe", "weekday")}
+    if keep["timeframe"]:
+        keep["cutoff"] = _timeframe_bucket(keep["timeframe"])
+    return CHART_CACHE.get_or_render(chart_key(ds.version, "heatmap", **keep), lambda: _heatmap_png(ds, args))
 
 def heatmap_cmd(update, context):
-    df = _read_csv_safely(TRADES_PATH)
-    if df.empty:
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
         update.effective_message.reply_text("No CSV loaded."); return
-    pcol = _auto_profit_col(df); tcol = _auto_time_col(df); scol = _auto_symbol_col(df)
-    if not pcol:
+    if not ds.pcol:
         update.effective_message.reply_text("No profit column detected. Try /samplecsv."); return
     args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
-    args = _parse_args(args_txt)
-    df2 = _apply_filters(df.copy(), args, tcol or "", scol or "")
-    tvals = _parse_maybe_datetime(df2[tcol]) if tcol and tcol in df2.columns else pd.to_datetime(pd.Series(range(len(df2))), errors="coerce")
-    df2 = df2.assign(__date=(tvals.dt.date if hasattr(tvals.dt, "date") else pd.Series([""]*len(df2))))
-    col_for_cols = scol if (scol and scol in df2.columns) else "__date"
-    pivot = df2.pivot_table(index="__date", columns=col_for_cols, values=pcol, aggfunc="sum", fill_value=0.0)
-    if pivot.empty:
+    try:
+        png = _cached_heatmap(ds, _parse_args(args_txt))
+    except ChartError as e:
+        update.effective_message.reply_text(f"⏳ {e}"); return
+    if png is None:
         update.effective_message.reply_text("No data for heatmap."); return
-    fig = plt.figure(figsize=(8,5)); plt.imshow(pivot.values, aspect='auto')
-    plt.title("PnL Heatmap"); plt.xlabel(col_for_cols); plt.ylabel("Date"); plt.tight_layout()
-    out = io.BytesIO(); fig.savefig(out, format="png"); plt.close(fig); out.seek(0); out.name = "heatmap.png"
-    update.effective_message.reply_photo(out, caption="PnL Heatmap")
+    _send_photo(update.effective_message, png, "heatmap.png", caption="PnL Heatmap")
 
 def topdrawdown_cmd(update, context):
-    df = _read_csv_safely(TRADES_PATH)
+    df = _load_trades(TRADES_PATH)
     if df.empty:
         update.effective_message.reply_text("No CSV loaded."); return
     pcol = _auto_profit_col(df); tcol = _auto_time_col(df)
@@ -456,7 +638,7 @@ def topdrawdown_cmd(update, context):
     update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
 
 def beststreak_cmd(update, context):
-    df = _read_csv_safely(TRADES_PATH)
+    df = _load_trades(TRADES_PATH)
     if df.empty:
         update.effective_message.reply_text("No CSV loaded."); return
     pcol = _auto_profit_col(df); tcol = _auto_time_col(df)
@@ -475,17 +657,47 @@ def beststreak_cmd(update, context):
     html = "<b>🏆 Streaks</b>\n<pre>" + "\\n".join(lines) + "</pre>"
     update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
 
+CAPTION_LIMIT = 1024
+
+def _report_png(ds, df, pcol, scol):
+    """Composite report: equity / drawdown / daily PnL panels plus the summary and per-symbol tables."""
+    def build():
+        order, r, e = ds.time_sorted()
+        dates = bool(ds.tvalid.any())
+        x = e.astype("datetime64[s]") if dates else np.arange(1, r.shape[0] + 1)
+        eq = np.cumsum(r); dd = eq - np.maximum.accumulate(eq)
+        eq_x, eq_y = minmax(x, eq); dd_x, dd_y = minmax(x, dd)
+        day = pyramid(ds).get("day") if dates else None
+        day_x, day_pnl = (day["start"], day["pnl"]) if day is not None else (None, None)
+        return chartpool.render(charts.report, eq_x, eq_y, dd_x, dd_y, day_x, day_pnl,
+                                _summary_lines(df, pcol), _perfs_lines(df, pcol, scol, top=10), dates)
+    return CHART_CACHE.get_or_render(chart_key(ds.version, "report"), build)
+
+def _send_album(message, items):
+    """items: [(png bytes, caption html)] sent as one media group; known images go by file_id."""
+    from telegram import InputMediaPhoto
+    keys = [FILE_IDS.key(png, "photo") for png, _ in items]
+    media = [InputMediaPhoto(FILE_IDS.get(k) or _photo(png, f"report{i}.png"), caption=cap, parse_mode=ParseMode.HTML)
+             for i, (k, (png, cap)) in enumerate(zip(keys, items))]
+    sent = message.reply_media_group(media)
+    for k, m in zip(keys, sent):
+        try:
+            FILE_IDS.put(k, m.photo[-1].file_id)
+        except (AttributeError, IndexError, TypeError):
+            pass
+    return sent
+
 def report_cmd(update, context):
-    # One-shot: summary + perfs (top 10) + top drawdowns + equity image
-    df = _read_csv_safely(TRADES_PATH)
+    # One-shot: summary + perfs (top 10) + top drawdowns + charts, as one composite photo (or `album`)
+    df = _load_trades(TRADES_PATH)
     if df.empty:
         update.effective_message.reply_text("No CSV loaded."); return
     pcol = _auto_profit_col(df); tcol = _auto_time_col(df); scol = _auto_symbol_col(df)
     if not pcol:
         update.effective_message.reply_text("No profit column detected. Try /samplecsv."); return
+    album = any(a.lower() in ("album", "mode=album") for a in (context.args or []))
     # text blocks
     summary = _summary_html(df, pcol)
-    perfs = _perfs_table(df, pcol, scol, top=10)
     r = pd.to_numeric(df[pcol], errors="coerce").fillna(0.0).astype(float).reset_index(drop=True)
     tvals = _parse_maybe_datetime(df[tcol]) if tcol else None
     rows = _top_drawdowns(r, tvals, top=3)
@@ -493,17 +705,432 @@ def report_cmd(update, context):
     for s, e, d in rows:
         s2 = str(s)[:16]; e2 = str(e)[:16]
         dd_lines.append(f"{s2:<16} {e2:<16} {d:>10.2f}")
-    drawdowns = "<pre>" + "\\n".join(dd_lines) + "</pre>"
-    # send text
-    update.effective_message.reply_text("<b>📄 Report</b>\n" + summary, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
-    update.effective_message.reply_text("<b>📈 Per-Symbol (Top 10)</b>\n" + perfs, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
-    update.effective_message.reply_text("<b>📉 Drawdowns</b>\n" + drawdowns, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
-    # send equity image
-    eq = _equity_curve(r)
-    fig = plt.figure(figsize=(8,4)); plt.plot(eq.index.values, eq.values)
-    plt.title("Equity Curve"); plt.xlabel("Trade #"); plt.ylabel("Equity"); plt.tight_layout()
-    out = io.BytesIO(); fig.savefig(out, format="png"); plt.close(fig); out.seek(0); out.name = "equity.png"
-    update.effective_message.reply_photo(out, caption="Equity curve")
+    drawdowns = "<b>📉 Drawdowns</b>\n<pre>" + "\n".join(dd_lines) + "</pre>"
+    ds = load_dataset(TRADES_PATH)
+    try:
+        if album:
+            perfs = "<b>📈 Per-Symbol (Top 10)</b>\n" + _perfs_table(df, pcol, scol, top=10)
+            items = [(_cached_graph(ds, "equity"), "<b>📄 Report</b>\n" + summary), (_cached_graph(ds, "dd"), drawdowns)]
+            daily = _cached_graph(ds, "daily")
+            if daily is not None:
+                items.append((daily, perfs))
+            if all(len(cap) <= CAPTION_LIMIT for _, cap in items):
+                _send_album(update.effective_message, items); return
+        png = _report_png(ds, df, pcol, scol)
+    except ChartError as e:
+        update.effective_message.reply_text(f"⏳ Report chart skipped: {e}")
+        update.effective_message.reply_text("<b>📄 Report</b>\n" + summary + "\n" + drawdowns, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+        return
+    _send_photo(update.effective_message, png, "report.png", caption="<b>📄 Report</b>\n" + summary + "\n" + drawdowns, parse_mode=ParseMode.HTML)
+
+def montecarlo_cmd(update, context):
+    df = _load_trades(TRADES_PATH)
+    if df.empty:
+        update.effective_message.reply_text("No CSV loaded."); return
+    pcol = _auto_profit_col(df)
+    if not pcol:
+        update.effective_message.reply_text("No profit column detected. Try /samplecsv."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    try:
+        runs = int(args.get("runs", 10000)); block = int(args.get("block", 1))
+    except ValueError:
+        update.effective_message.reply_text("Usage: /montecarlo runs=10000 [block=20]"); return
+    r = pd.to_numeric(df[pcol], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    if r.shape[0] < 2:
+        update.effective_message.reply_text("Need at least 2 trades."); return
+    res = montecarlo.simulate(r, runs=runs, block=block)
+    lines = [f"Runs {res['runs']} | Trades {res['trades']} | Block {res['block']}",
+             f"{'Pct':<5} {'Final':>12} {'MaxDD':>12}"]
+    for p in montecarlo.PCTS:
+        lines.append(f"P{p:<4} {res['final'][p]:>12.2f} {res['maxdd'][p]:>12.2f}")
+    lines.append(f"P(loss): {res['p_loss']:.2f}%")
+    html = "<b>🎲 Monte Carlo</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    x = res["steps"]; fan = res["fan"]
+    fig = figure("line"); ax = fig.add_subplot()
+    ax.fill_between(x, fan[0], fan[4], alpha=0.2, label="P5–P95")
+    ax.fill_between(x, fan[1], fan[3], alpha=0.35, label="P25–P75")
+    ax.plot(x, fan[2], label="Median"); ax.plot(x, res["actual"], color="black", linewidth=1, label="Actual")
+    ax.set_title("Monte Carlo Equity Fan"); ax.set_xlabel("Trade #"); ax.set_ylabel("Equity"); ax.legend(loc="upper left"); fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "montecarlo.png", caption=f"Monte Carlo fan ({res['runs']} runs)")
+
+def correlation_cmd(update, context):
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
+        update.effective_message.reply_text("No CSV loaded."); return
+    if not ds.pcol or not ds.scol or not ds.tcol:
+        update.effective_message.reply_text("Need profit, symbol and time columns. Try /columns."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    args.setdefault("timeframe", "90d")
+    try:
+        top = max(2, min(int(args.get("top", 20)), 50))
+    except ValueError:
+        update.effective_message.reply_text("Usage: /correlation [timeframe=90d top=20]"); return
+    key = ("corr", top) + _filter_key(args)
+    names, corr = ds.memo(key, lambda: daily_corr(ds, _filter_mask(ds, args), top=top))
+    if len(names) < 2:
+        update.effective_message.reply_text("Need at least 2 symbols with trades in this timeframe."); return
+    lines = ["Most correlated pairs"] + [f"{a[:9]:<9} {b[:9]:<9} {rho:>6.2f}" for a, b, rho in top_pairs(names, corr)]
+    update.effective_message.reply_text("<b>🔗 Correlation</b>\n<pre>" + "\n".join(lines) + "</pre>", parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    n = len(names)
+    fig = figure("grid", figsize=(max(6, 0.45*n + 2), max(5, 0.45*n + 1))); ax = fig.add_subplot()
+    im = ax.imshow(corr, cmap="RdBu_r", vmin=-1, vmax=1, interpolation="nearest"); fig.colorbar(im, ax=ax, label="ρ")
+    ax.set_xticks(range(n), names, rotation=45, ha="right"); ax.set_yticks(range(n), names)
+    if n <= 20:
+        for i in range(n):
+            for j in range(n):
+                ax.text(j, i, f"{corr[i, j]:.2f}", ha="center", va="center", fontsize=7)
+    ax.set_title(f"Daily PnL correlation ({args['timeframe']})"); fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "correlation.png", caption="Daily PnL correlation")
+
+def positions_cmd(update, context):
+    df = _read_csv_safely(TRADES_PATH)
+    if df.empty:
+        update.effective_message.reply_text("No CSV loaded."); return
+    cols = fill_columns(df)
+    if cols is None:
+        update.effective_message.reply_text("CSV has no side/qty/price fill columns."); return
+    closes, positions = reconstruct(df, *cols, tcol=_auto_time_col(df), scol=_auto_symbol_col(df))
+    hold = closes["holding_s"].dropna()
+    lines = [f"Closing fills: {len(closes)} | Realised: {float(closes['realized_pnl'].sum()):.2f}"]
+    if len(hold):
+        lines.append(f"Avg hold: {pd.Timedelta(seconds=float(hold.mean()))}".split(".")[0])
+    lines += ["", f"{'Symbol':<10} {'Qty':>12} {'AvgCost':>12}"]
+    for r in positions.itertuples():
+        lines.append(f"{str(r.symbol)[:10]:<10} {r.qty:>12.6g} {r.avg_cost:>12.4f}")
+    if positions.empty:
+        lines.append("(flat)")
+    html = "<b>📦 Positions</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+
+def project_cmd(update, context):
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    usage = "Usage: /project amount=1000 days=30 daily=2 | pertrade=1 trades=5\nLists (daily=1,2,3) or ranges (days=30:180:30) run a sweep."
+    per_trade = "pertrade" in args or args.get("mode", "").lower() == "pertrade"
+    try:
+        amount = float(args.get("amount", 1000))
+    except ValueError:
+        amount = -1.0
+    days = projection.parse_grid(args.get("days", "30"))
+    rates = projection.parse_grid(args.get("pertrade", "1") if per_trade else args.get("daily", "2"))
+    trades = projection.parse_grid(args.get("trades", "5")) if per_trade else np.array([1.0])
+    if not np.isfinite(amount) or amount <= 0 or days is None or rates is None or trades is None or days.min() < 1 or days.max() > projection.MAX_DAYS or (rates <= -100).any() or (trades < 1).any():
+        update.effective_message.reply_text(usage); return
+    days = np.unique(days.astype(np.int64))
+    overflow = f"Projection overflows (balance beyond {projection.MAX_BALANCE:,.0f}). Use fewer days or a lower rate."
+    if per_trade:
+        growth = projection.growth_factor(per_trade_pct=rates[:, None], trades_per_day=trades[None, :]).ravel()
+        labels = [f"{r:g}%x{int(t)}" for r in rates for t in trades]
+    else:
+        growth = projection.growth_factor(daily_pct=rates)
+        labels = [f"{r:g}%/d" for r in rates]
+    if growth.size == 1 and days.size == 1:
+        rows = projection.project(amount, int(days[0]), float(growth[0]))
+        if not projection.in_range(rows["start"], rows["profit"], rows["end"]):
+            update.effective_message.reply_text(overflow); return
+        step = max(1, -(-len(rows["day"]) // 40))
+        pick = sorted(set(range(0, len(rows["day"]), step)) | {len(rows["day"]) - 1})
+        lines = [f"{'Day':>4} {'Start':>14} {'Profit':>12} {'End':>14}"]
+        for i in pick:
+            lines.append(f"{int(rows['day'][i]):>4} {rows['start'][i]:>14,.2f} {rows['profit'][i]:>12,.2f} {rows['end'][i]:>14,.2f}")
+        html = f"<b>📐 Projection</b> ({labels[0]}, {int(days[0])}d)\n<pre>" + "\n".join(lines) + "</pre>"
+        update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+        fig = figure("line"); ax = fig.add_subplot(); ax.plot(rows["day"], rows["end"])
+        ax.set_title("Projected Equity"); ax.set_xlabel("Day"); ax.set_ylabel("Balance")
+        caption = f"Projection for {int(days[0])} days — {amount:,.2f} start"
+    else:
+        if growth.size > 40:
+            update.effective_message.reply_text("Sweep too large (max 40 rate combinations)."); return
+        sw = projection.sweep(amount, growth, days)
+        if not projection.in_range(sw["paths"]):
+            update.effective_message.reply_text(overflow); return
+        lines = [f"{'Rate':<12}" + "".join(f"{str(int(d)) + 'd':>14}" for d in days[:6])]
+        for lab, row in zip(labels, sw["at"]):
+            lines.append(f"{lab[:12]:<12}" + "".join(f"{v:>14,.0f}" for v in row[:6]))
+        html = f"<b>📐 Projection sweep</b> (start {amount:,.2f})\n<pre>" + "\n".join(lines) + "</pre>"
+        update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+        fig = figure("line"); ax = fig.add_subplot()
+        ax.fill_between(sw["day"], sw["paths"].min(axis=0), sw["paths"].max(axis=0), alpha=0.2)
+        from matplotlib import colormaps
+        colors = colormaps["viridis"](np.linspace(0, 1, len(labels)))
+        for lab, path, c in zip(labels, sw["paths"], colors):
+            ax.plot(sw["day"], path, color=c, linewidth=1, label=lab if len(labels) <= 10 else None)
+        for d in days:
+            ax.axvline(d, color="grey", linewidth=0.5, linestyle=":")
+        if len(labels) <= 10:
+            ax.legend(loc="upper left", fontsize=7)
+        ax.set_yscale("log"); ax.set_title("Projection Fan"); ax.set_xlabel("Day"); ax.set_ylabel("Balance (log)")
+        caption = f"Projection sweep — {len(labels)} rates x {len(days)} horizons"
+    fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "projection.png", caption=caption)
+
+def distribution_cmd(update, context):
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
+        update.effective_message.reply_text("No CSV loaded."); return
+    if not ds.pcol:
+        update.effective_message.reply_text("No profit column detected. Try /samplecsv."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    symbol = _parse_args(args_txt).get("symbol")
+    SKETCHES.sync(ds)
+    kll, mom = SKETCHES.get(symbol)
+    if kll is None or kll.n == 0:
+        update.effective_message.reply_text("No trades for that symbol."); return
+    p1, p5, p50, p95, p99 = kll.quantiles([0.01, 0.05, 0.5, 0.95, 0.99])
+    lines = [
+        f"Distribution {(symbol or 'ALL').upper()}",
+        f"Trades   : {mom.n:>10d}",
+        f"Mean/Std : {mom.mean:>10.2f} | {mom.std:.2f}",
+        f"Median   : {p50:>10.2f}",
+        f"P1 / P5  : {p1:>10.2f} | {p5:.2f}",
+        f"P95 / P99: {p95:>10.2f} | {p99:.2f}",
+        f"Skew     : {mom.skew:>10.2f}",
+        f"Kurtosis : {mom.kurtosis:>10.2f}",
+    ]
+    html = "<b>📊 PnL Distribution</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    items, w = kll.weighted()
+    fig = figure("line"); ax = fig.add_subplot(); ax.hist(items, bins=50, weights=w)
+    for q, ls in ((p5, ":"), (p50, "-"), (p95, ":")):
+        ax.axvline(q, color="black", linewidth=1, linestyle=ls)
+    ax.set_title("PnL Distribution"); ax.set_xlabel("PnL per trade"); ax.set_ylabel("Trades"); fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "distribution.png", caption="PnL distribution (P5 / median / P95)")
+
+def _profile_lines(title, labels, prof):
+    lines = [f"{title:<5} {'Trades':>6} {'PnL':>10} {'Win%':>7}"]
+    for lab, n, pnl, w in zip(labels, prof["count"], prof["pnl"], prof["wins"]):
+        if n:
+            lines.append(f"{lab:<5} {int(n):>6d} {pnl:>10.2f} {100.0*w/n:>6.1f}%")
+    return lines
+
+def timeprofile_cmd(update, context):
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
+        update.effective_message.reply_text("No CSV loaded."); return
+    if not ds.pcol or not ds.tcol:
+        update.effective_message.reply_text("Need profit and time columns. Try /columns."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    key = ("timeprofile",) + _filter_key(args)
+    prof = ds.memo(key, lambda: time_profile(ds, _filter_mask(ds, args)))
+    if not prof["grid"]["count"].any():
+        update.effective_message.reply_text("No timestamped trades for this filter."); return
+    lines = _profile_lines("Hour", [f"{h:02d}" for h in range(24)], prof["hour"])
+    lines += [""] + _profile_lines("Day", WEEKDAYS, prof["weekday"])
+    html = "<b>🕒 Time Profile (UTC)</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    grid = prof["grid"]["pnl"]; vmax = float(np.abs(grid).max()) or 1.0
+    fig = figure("grid"); ax = fig.add_subplot()
+    im = ax.imshow(grid, aspect='auto', cmap="RdYlGn", vmin=-vmax, vmax=vmax, interpolation="nearest")
+    fig.colorbar(im, ax=ax, label="PnL"); ax.set_xticks(range(7), WEEKDAYS); ax.set_yticks(range(0, 24, 2), [f"{h:02d}" for h in range(0, 24, 2)])
+    ax.set_title("PnL by Hour x Weekday"); ax.set_xlabel("Weekday"); ax.set_ylabel("Hour (UTC)"); fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "timeprofile.png", caption="Hour x weekday PnL")
+
+def whatif_cmd(update, context):
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
+        update.effective_message.reply_text("No CSV loaded."); return
+    if not ds.pcol:
+        update.effective_message.reply_text("No profit column detected. Try /samplecsv."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    base = _filter_mask(ds, args)
+    try:
+        m, r, notes = whatif.apply(ds, base, args)
+    except ValueError as e:
+        update.effective_message.reply_text(f"❌ {e}\nUsage: /whatif exclude=DOGE,SHIB hours=8-20 fee=0.05% slippage=2bp maxloss=50"); return
+    before = summarize(ds.pnl[base]); after = summarize(r)
+    lines = [f"{'':<7} {'Actual':>11} {'What-if':>11}"]
+    for key, label in METRIC_LABELS:
+        lines.append(f"{label:<7} {fmt_metric(key, before[key]):>11} {fmt_metric(key, after[key]):>11}")
+    html = "<b>🧪 What-if</b> " + (", ".join(notes) or "no rules") + "\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    if args.get("chart", "0") in ("1", "yes", "on", "true"):
+        fig = figure("line"); ax = fig.add_subplot()
+        ax.plot(*minmax(None, np.cumsum(ds.pnl[base])), label="Actual")
+        ax.plot(*minmax(np.flatnonzero(m[base]), np.cumsum(r)), label="What-if")
+        ax.set_title("What-if Equity"); ax.set_xlabel("Trade #"); ax.set_ylabel("Equity"); ax.legend(loc="upper left"); fig.tight_layout()
+        _send_photo(update.effective_message, to_png(fig), "whatif.png", caption="What-if equity")
+
+def compare_cmd(update, context):
+    words = list(context.args) if getattr(context, "args", None) else []
+    args = _parse_args(" ".join(words))
+    cat = compare.catalog(TRADES_PATH)
+    names = [w.lower() for w in words if "=" not in w]
+    unknown = [n for n in names if n not in cat]
+    if unknown:
+        update.effective_message.reply_text("Unknown dataset(s): " + ", ".join(unknown) + "\nKnown: " + ", ".join(cat)); return
+    sort = args.get("sort", "pnl").lower()
+    ranked, skipped = compare.compare({n: cat[n] for n in (names or cat)}, sort=sort)
+    if not ranked:
+        update.effective_message.reply_text("No comparable datasets found."); return
+    lines = [f"{'#':<2} {'Dataset':<12} {'Trades':>6} {'PnL':>10} {'Win%':>6} {'PF':>5} {'MaxDD':>9} {'Sharpe':>6}"]
+    for i, (name, st, _) in enumerate(ranked, 1):
+        lines.append(f"{i:<2} {name[:12]:<12} {st['trades']:>6d} {st['pnl']:>10.2f} {st['win_pct']:>5.1f}% {fmt_metric('pf', st['pf']):>5} {st['maxdd']:>9.2f} {st['sharpe']:>6.2f}")
+    if skipped:
+        lines += ["", "Skipped (missing/empty): " + ", ".join(skipped)]
+    html = f"<b>🏁 Compare</b> (by {sort})\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    fig = figure("line"); ax = fig.add_subplot()
+    for name, _, ds in ranked:
+        ax.plot(*minmax(np.arange(1, len(ds) + 1), np.cumsum(ds.pnl)), label=name)
+    ax.set_title("Equity Comparison"); ax.set_xlabel("Trade #"); ax.set_ylabel("Equity"); ax.legend(loc="upper left", fontsize=8); fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "compare.png", caption="Equity comparison")
+
+def _batch_html(results, done, total, sort, top, final=False):
+    rows, ok, bad = batch.leaderboard(results, sort=sort, top=top)
+    lines = [f"{done}/{total} files | ok {ok} | skipped {bad}", f"{'#':<3} {'File':<22} {'Trades':>6} {'PnL':>10} {'PF':>5} {'MaxDD':>9}"]
+    for i, (name, st) in enumerate(rows, 1):
+        lines.append(f"{i:<3} {os.path.basename(name)[-22:]:<22} {st['trades']:>6d} {st['pnl']:>10.2f} {fmt_metric('pf', st['pf']):>5} {st['maxdd']:>9.2f}")
+    head = "<b>🏆 Batch leaderboard</b>" if final else "<b>⏳ Batch running…</b>"
+    return f"{head} (by {sort})\n<pre>" + "\n".join(lines) + "</pre>"
+
+def _run_batch(update, path, args):
+    sort = args.get("sort", "pnl").lower()
+    try:
+        top = max(1, min(int(args.get("top", 20)), 50))
+    except ValueError:
+        top = 20
+    srcs = batch.sources(path)
+    if not srcs:
+        update.effective_message.reply_text("No CSV files found."); return
+    msg = update.effective_message.reply_text(f"⏳ Analysing {len(srcs)} files…")
+    def progress(results, done, total):
+        try:
+            msg.edit_text(_batch_html(results, done, total, sort, top, final=(done == total)), parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+        except Exception:
+            pass
+    batch.run(srcs, on_progress=progress)
+
+def batch_cmd(update, context):
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    root = os.path.realpath(BATCH_DIR)
+    path = os.path.realpath(os.path.join(root, args.get("path", ".")))
+    if os.path.commonpath([root, path]) != root or not os.path.exists(path):
+        update.effective_message.reply_text(f"Path must exist inside BATCH_DIR ({BATCH_DIR}). Or send a .zip of CSVs."); return
+    try:
+        _run_batch(update, path, args)
+    except Exception as e:
+        traceback.print_exc(); update.effective_message.reply_text(f"❌ Batch failed: {e}")
+
+def walkforward_cmd(update, context):
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
+        update.effective_message.reply_text("No CSV loaded."); return
+    if not ds.pcol:
+        update.effective_message.reply_text("No profit column detected. Try /samplecsv."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    try:
+        folds = max(1, min(int(args.get("folds", 5)), 50)); train = max(1, min(int(args.get("train", 1)), 10))
+        _, r, e = ds.time_sorted()
+        wf = ds.memo(("walkforward", folds, train), lambda: walk_forward(r, folds=folds, train=train))
+    except ValueError as ex:
+        update.effective_message.reply_text(f"❌ {ex}. Usage: /walkforward folds=5 [train=1]"); return
+    tr, te = wf["train"], wf["test"]
+    lines = [f"Segment: {wf['seg']} trades" + ("" if ds.tcol else " (file order, no time column)"),
+             f"{'Fold':<4} {'TestFrom':<10} {'TrAvg':>7} {'TeAvg':>7} {'TrWin':>6} {'TeWin':>6} {'TeDD':>9}"]
+    for k in range(folds):
+        i0 = wf["offset"] + (k + train) * wf["seg"]
+        start = str(np.datetime64(int(e[i0]), "s"))[:10] if ds.tcol and ds.tvalid.any() else f"#{i0+1}"
+        lines.append(f"{k+1:<4} {start:<10} {tr['avg'][k]:>7.2f} {te['avg'][k]:>7.2f} {tr['win_pct'][k]:>5.1f}% {te['win_pct'][k]:>5.1f}% {te['maxdd'][k]:>9.2f}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eff = np.where(tr["avg"] != 0, te["avg"] / tr["avg"], np.nan)
+    lines += ["", f"Test avg mean/std : {te['avg'].mean():.2f} / {te['avg'].std():.2f}",
+              f"Test/train avg eff: {np.nanmedian(eff) if np.isfinite(eff).any() else float('nan'):.2f} (median)",
+              f"Profitable tests  : {int((te['pnl'] > 0).sum())}/{folds}"]
+    html = "<b>🚶 Walk-forward</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    x = np.arange(1, folds + 1)
+    fig = figure("line"); ax = fig.add_subplot()
+    ax.bar(x - 0.2, tr["avg"], width=0.4, label="Train avg"); ax.bar(x + 0.2, te["avg"], width=0.4, label="Test avg")
+    ax.axhline(0, color="black", linewidth=0.8)
+    ax.set_title("Walk-forward: train vs test avg PnL/trade"); ax.set_xlabel("Fold"); ax.set_ylabel("Avg PnL"); ax.set_xticks(x); ax.legend(loc="upper left"); fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "walkforward.png", caption="Walk-forward degradation")
+
+def _fmt_dur(sec):
+    sec = float(sec)
+    if not np.isfinite(sec): return "-"
+    if sec < 3600: return f"{sec/60:.1f}m"
+    if sec < 86400: return f"{sec/3600:.1f}h"
+    return f"{sec/86400:.1f}d"
+
+def holding_cmd(update, context):
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
+        update.effective_message.reply_text("No CSV loaded."); return
+    hold = ds.hold
+    if not ds.pcol or hold is None:
+        update.effective_message.reply_text("Need open/close time columns (e.g. open_time,close_time) or raw fills."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    start, end, ok = hold
+    m = ok & _filter_mask(ds, _parse_args(args_txt))
+    if not m.any():
+        update.effective_message.reply_text("No trades with valid open/close times."); return
+    s0, e0, r = start[m], end[m], ds.pnl[m]
+    dur = (e0 - s0).astype(np.float64)
+    win = r > 0
+    b = holding.by_duration(dur, r)
+    t, live = holding.concurrency(s0, e0)
+    lines = [
+        f"Trades    : {int(m.sum())}",
+        f"Avg hold  : {_fmt_dur(dur.mean())} | median {_fmt_dur(np.median(dur))}",
+        f"Wins hold : {_fmt_dur(dur[win].mean()) if win.any() else '-'}",
+        f"Loss hold : {_fmt_dur(dur[~win].mean()) if (~win).any() else '-'}",
+        f"Max open  : {int(live.max())} | avg {float(np.average(live[:-1], weights=np.diff(t))) if t.size > 1 and t[-1] > t[0] else float(live.max()):.2f}",
+        "", f"{'Hold':<7} {'Trades':>6} {'PnL':>10} {'Win%':>6}",
+    ]
+    for lab, n, pnl, w in zip(b["label"], b["count"], b["pnl"], b["wins"]):
+        if n:
+            lines.append(f"{lab:<7} {int(n):>6d} {pnl:>10.2f} {100.0*w/n:>5.1f}%")
+    html = "<b>⏱ Holding Time</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    fig = figure("tall"); ax1, ax2 = fig.subplots(2, 1)
+    ax1.scatter(np.maximum(dur, 1) / 3600.0, r, s=6, c=np.where(win, "tab:green", "tab:red"), alpha=0.6)
+    ax1.set_xscale("log"); ax1.axhline(0, color="black", linewidth=0.8)
+    ax1.set_title("PnL vs holding time"); ax1.set_xlabel("Hours held (log)"); ax1.set_ylabel("PnL")
+    ax2.step(*minmax(t.astype("datetime64[s]"), live), where="post")
+    ax2.set_title("Concurrent open positions"); ax2.set_ylabel("Open")
+    fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "holding.png", caption="Holding time analytics")
+
+def sessions_cmd(update, context):
+    ds = load_dataset(TRADES_PATH)
+    if ds is None:
+        update.effective_message.reply_text("No CSV loaded."); return
+    if not ds.pcol or not ds.tvalid.any():
+        update.effective_message.reply_text("Need profit and time columns. Try /columns."); return
+    args_txt = " ".join(context.args) if getattr(context, "args", None) else ""
+    args = _parse_args(args_txt)
+    try:
+        gap = sessions.parse_gap(args.get("gap", "2h"))
+    except ValueError as e:
+        update.effective_message.reply_text(f"❌ {e}. Usage: /sessions gap=2h"); return
+    _, r, e = ds.time_sorted()
+    ss = ds.memo(("sessions", gap), lambda: sessions.split_sessions(e, r, gap))
+    n = len(ss["pnl"]); dur = ss["end"] - ss["start"]
+    def _row(i):
+        return f"{str(np.datetime64(int(ss['start'][i]), 's'))[:16]:<16} {int(ss['count'][i]):>5d} {_fmt_dur(dur[i]):>6} {ss['pnl'][i]:>9.2f}"
+    lines = [
+        f"Sessions  : {n} (gap {args.get('gap', '2h')})",
+        f"Win sess. : {int((ss['pnl'] > 0).sum())} ({100.0*(ss['pnl'] > 0).mean():.1f}%)",
+        f"Avg/sess  : {ss['pnl'].mean():.2f} PnL | {ss['count'].mean():.1f} trades | {_fmt_dur(dur.mean())}",
+        f"Corr(trades, PnL): {float(np.corrcoef(ss['count'], ss['pnl'])[0, 1]) if n > 2 and ss['count'].std() > 0 else 0.0:.2f}",
+        "", f"{'Best sessions':<16} {'Trd':>5} {'Dur':>6} {'PnL':>9}",
+    ]
+    order = np.argsort(ss["pnl"], kind="stable")
+    lines += [_row(i) for i in order[::-1][:3]]
+    lines += ["", f"{'Worst sessions':<16} {'Trd':>5} {'Dur':>6} {'PnL':>9}"] + [_row(i) for i in order[:3]]
+    html = "<b>🧭 Sessions</b>\n<pre>" + "\n".join(lines) + "</pre>"
+    update.effective_message.reply_text(html, parse_mode=ParseMode.HTML, disable_web_page_preview=True)
+    fig = figure("line"); ax = fig.add_subplot()
+    ax.bar(np.arange(1, n + 1), ss["pnl"], color=np.where(ss["pnl"] >= 0, "tab:green", "tab:red"), width=1.0)
+    ax.set_title("PnL per Session"); ax.set_xlabel("Session #"); ax.set_ylabel("PnL"); fig.tight_layout()
+    _send_photo(update.effective_message, to_png(fig), "sessions.png", caption=f"{n} sessions")
 
 # digest suite
 def digeststatus_cmd(update, context):
@@ -573,10 +1200,26 @@ def on_help_buttons(update, context):
 def on_document(update, context):
     try:
         doc = update.message.document
+        if doc and doc.file_name.lower().endswith(".zip"):
+            import tempfile
+            f = doc.get_file()
+            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tmp:
+                tmp.write(f.download_as_bytearray()); zpath = tmp.name
+            try:
+                _run_batch(update, zpath, _parse_args(update.message.caption or ""))
+            finally:
+                os.remove(zpath)
+            return
         if not doc or not doc.file_name.lower().endswith(".csv"):
             update.effective_message.reply_text("Please send a CSV file."); return
         f = doc.get_file(); content = f.download_as_bytearray()
         with open(TRADES_PATH, "wb") as fh: fh.write(content)
+        try:
+            ds = load_dataset(TRADES_PATH)
+            if ds is not None: SKETCHES.sync(ds)
+        except Exception:
+            traceback.print_exc()
+        threading.Thread(target=_prerender, daemon=True).start()
         update.effective_message.reply_text("✅ CSV saved. Use /summary or /graph.")
     except Exception as e:
         traceback.print_exc(); update.effective_message.reply_text(f"❌ Failed to save CSV: {e}")
@@ -591,6 +1234,18 @@ def register_handlers(dispatcher):
     dispatcher.add_handler(CommandHandler("topdrawdown", topdrawdown_cmd))
     dispatcher.add_handler(CommandHandler("beststreak", beststreak_cmd))
     dispatcher.add_handler(CommandHandler("report", report_cmd))
+    dispatcher.add_handler(CommandHandler("montecarlo", montecarlo_cmd))
+    dispatcher.add_handler(CommandHandler("correlation", correlation_cmd))
+    dispatcher.add_handler(CommandHandler("positions", positions_cmd))
+    dispatcher.add_handler(CommandHandler("project", project_cmd))
+    dispatcher.add_handler(CommandHandler("distribution", distribution_cmd))
+    dispatcher.add_handler(CommandHandler("timeprofile", timeprofile_cmd))
+    dispatcher.add_handler(CommandHandler("whatif", whatif_cmd))
+    dispatcher.add_handler(CommandHandler("compare", compare_cmd))
+    dispatcher.add_handler(CommandHandler("batch", batch_cmd))
+    dispatcher.add_handler(CommandHandler("walkforward", walkforward_cmd))
+    dispatcher.add_handler(CommandHandler("holding", holding_cmd))
+    dispatcher.add_handler(CommandHandler("sessions", sessions_cmd))
     dispatcher.add_handler(CommandHandler("columns", columns_cmd))
     dispatcher.add_handler(CommandHandler("trades", trades_cmd))
     dispatcher.add_handler(CommandHandler("status", status_cmd))
@@ -0,0 +1,74 @@
+import os, time, zipfile
+from concurrent.futures import wait, FIRST_COMPLETED
+from .procpool import process_pool, pool_size, reset_pool
+from .metrics import summarize
+
+# Leaderboard over many backtest CSVs (a directory or a .zip), analysed in chunks on the process pool.
+CHUNK = int(os.environ.get("BATCH_CHUNK", "16"))
+MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "5000"))
+
+def sources(path: str):
+    """[(container, member)] for every CSV under a directory (container None) or inside a zip."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            names = [n for n in zf.namelist() if n.lower().endswith(".csv") and not n.startswith("__MACOSX/")]
+        return [(path, n) for n in sorted(names)][:MAX_FILES]
+    out = []
+    for root, _, files in os.walk(path):
+        out += [(None, os.path.join(root, f)) for f in files if f.lower().endswith(".csv")]
+    return sorted(out, key=lambda s: s[1])[:MAX_FILES]
+
+def _analyze_one(container, member):
+    from . import _parse_trades, _auto_profit_col
+    import pandas as pd
+    if container:
+        import tempfile
+        with zipfile.ZipFile(container) as zf, tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp:
+            tmp.write(zf.read(member)); local = tmp.name
+        try:
+            df = _parse_trades(local)
+        finally:
+            os.remove(local)
+    else:
+        df = _parse_trades(member)
+    pcol = _auto_profit_col(df) if not df.empty else None
+    if not pcol:
+        return None
+    return summarize(pd.to_numeric(df[pcol], errors="coerce").fillna(0.0).to_numpy(dtype=float))
+
+def _analyze_chunk(items):
+    out = []
+    for container, member in items:
+        try:
+            out.append((member, _analyze_one(container, member), None))
+        except Exception as e:
+            out.append((member, None, str(e)))
+    return out
+
+def run(srcs, on_progress=None, progress_every: float = 2.0):
+    """Analyse every source; calls on_progress(results, done, total) as chunks complete. Returns results."""
+    chunks = [srcs[i:i + CHUNK] for i in range(0, len(srcs), CHUNK)]
+    results = []; last = 0.0; pending = set(); nxt = 0
+    pool = process_pool()
+    try:
+        # keep only a couple of chunks per worker in flight so huge batches don't pin every file in the queue
+        while nxt < len(chunks) or pending:
+            while nxt < len(chunks) and len(pending) < pool_size() * 2:
+                pending.add(pool.submit(_analyze_chunk, chunks[nxt])); nxt += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                results.extend(f.result())
+            if on_progress and (time.time() - last >= progress_every or not pending):
+                last = time.time()
+                on_progress(results, len(results), len(srcs))
+    except Exception:
+        for f in pending:
+            f.cancel()
+        reset_pool()
+        raise
+    return results
+
+def leaderboard(results, sort: str = "pnl", top: int = 20):
+    ok = [(m, st) for m, st, err in results if st]
+    ok.sort(key=lambda x: x[1].get(sort, x[1]["pnl"]), reverse=True)
+    return ok[:top], len(ok), len(results) - len(ok)
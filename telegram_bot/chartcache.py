@@ -0,0 +1,71 @@
+import os, threading
+from collections import OrderedDict
+
+# Rendered chart PNGs keyed on (dataset version, chart kind, normalised args), evicted LRU by total bytes.
+
+def chart_key(version, kind: str, **args) -> tuple:
+    norm = tuple(sorted((k, str(v).strip().lower()) for k, v in args.items() if v not in (None, "")))
+    return (version, kind, norm)
+
+class PngCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict(); self._bytes = 0
+        self._lock = threading.Lock(); self._inflight = {}
+        self.hits = 0; self.misses = 0; self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key); self.hits += 1
+            return data
+
+    def put(self, key, data: bytes):
+        if not data or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = data; self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self._bytes -= len(dropped); self.evictions += 1
+
+    def get_or_render(self, key, render):
+        """Cached bytes for key, else render() once even if several threads ask at the same time."""
+        data = self.get(key)
+        if data is not None:
+            return data
+        with self._lock:
+            ev = self._inflight.get(key)
+            owner = ev is None
+            if owner:
+                ev = self._inflight[key] = threading.Event()
+        if not owner:
+            ev.wait()
+            data = self.get(key)
+            if data is not None:
+                return data
+            return render()
+        try:
+            data = render()
+            if data is not None:
+                self.put(key, data)
+            return data
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            ev.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "hit_rate": (self.hits / total * 100.0) if total else 0.0}
+
+CHART_CACHE = PngCache(int(float(os.environ.get("CHART_CACHE_MB", "32")) * 1024 * 1024))
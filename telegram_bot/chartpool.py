@@ -0,0 +1,98 @@
+import os, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Small dedicated pool for chart rendering so Agg rasterising never holds the GIL of the web workers.
+# CHART_WORKERS=0 renders in the calling thread instead.
+WORKERS = int(os.environ.get("CHART_WORKERS", "2"))
+MAX_QUEUE = int(os.environ.get("CHART_MAX_QUEUE", "8"))
+TIMEOUT = float(os.environ.get("CHART_TIMEOUT", "20"))
+
+class ChartError(RuntimeError):
+    pass
+
+_POOL = None
+_WARMING = []  # _noop futures of the current pool; done once every worker has run _warm
+_LOCK = threading.Lock()
+_SLOTS = threading.BoundedSemaphore(max(1, MAX_QUEUE))
+# at most one render per worker is handed to the executor, so TIMEOUT measures rendering, not queueing
+_RUNNING = threading.BoundedSemaphore(max(1, WORKERS))
+_STATS = {"rendered": 0, "rejected": 0, "timeouts": 0, "in_flight": 0}
+
+def _warm():
+    # runs once per worker: import matplotlib/Agg and build the font cache before the first real chart
+    import matplotlib
+    matplotlib.use("Agg")
+    from . import charts
+    charts.line([0, 1], [0, 1], "", "", "")
+
+def _noop():
+    return None
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"), initializer=_warm)
+            _WARMING[:] = [_POOL.submit(_noop) for _ in range(WORKERS)]
+        return _POOL
+
+def _reset(pool, kill: bool = False):
+    global _POOL
+    with _LOCK:
+        if _POOL is not pool:
+            return  # someone else already replaced it
+        _POOL = None
+    if kill:
+        # a stuck render can't be cancelled: stop the workers and let the next call start a fresh pool
+        for p in list(getattr(pool, "_processes", {}).values()):
+            p.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+    if kill:
+        _pool()  # warm the replacement now; renders killed alongside the stuck one retry on it
+
+def warm():
+    """Start the workers now (they import matplotlib in the background) instead of on the first chart."""
+    if WORKERS > 0:
+        _pool()
+
+def render(fn, *args) -> bytes:
+    """fn(*args) in the chart pool; ChartError when too many renders are queued or this one renders longer than TIMEOUT."""
+    if WORKERS <= 0:
+        return fn(*args)
+    if not _SLOTS.acquire(blocking=False):
+        with _LOCK:
+            _STATS["rejected"] += 1
+        raise ChartError("chart renderer busy, try again in a moment")
+    with _LOCK:
+        _STATS["in_flight"] += 1
+    try:
+        for attempt in range(2):
+            with _RUNNING:
+                pool = _pool()
+                wait(list(_WARMING), timeout=TIMEOUT)  # worker start-up is not render time
+                fut = pool.submit(fn, *args)
+                try:
+                    data = fut.result(timeout=TIMEOUT)
+                except FutureTimeout:
+                    with _LOCK:
+                        _STATS["timeouts"] += 1
+                    _reset(pool, kill=True)
+                    raise ChartError(f"chart took longer than {TIMEOUT:.0f}s")
+                except BrokenProcessPool:
+                    # killed along with someone else's stuck render (or crashed): retry once on a fresh pool
+                    _reset(pool)
+                    if attempt:
+                        raise ChartError("chart renderer restarted, try again")
+                    continue
+            with _LOCK:
+                _STATS["rendered"] += 1
+            return data
+    finally:
+        with _LOCK:
+            _STATS["in_flight"] -= 1
+        _SLOTS.release()
+
+def stats() -> dict:
+    with _LOCK:
+        return dict(_STATS, workers=WORKERS, max_queue=MAX_QUEUE)
@@ -0,0 +1,47 @@
+import numpy as np
+from .render import figure, to_png
+
+# Pure drawing functions: plain arrays/strings in, PNG bytes out, so they can run in the chart pool.
+
+def line(x, y, title: str, xlabel: str, ylabel: str, dates: bool = False) -> bytes:
+    fig = figure("line"); ax = fig.add_subplot(); ax.plot(x, y)
+    ax.set_title(title); ax.set_xlabel(xlabel); ax.set_ylabel(ylabel)
+    if dates:
+        fig.autofmt_xdate(rotation=45)
+    fig.tight_layout()
+    return to_png(fig)
+
+def heatmap(grid, xlabels, ylabels, title: str, xlabel: str, ylabel: str) -> bytes:
+    vmax = float(np.abs(grid).max()) or 1.0
+    fig = figure("grid"); ax = fig.add_subplot()
+    im = ax.imshow(grid, aspect='auto', cmap="RdYlGn", vmin=-vmax, vmax=vmax, interpolation="nearest")
+    fig.colorbar(im, ax=ax, label="PnL")
+    xs = np.unique(np.linspace(0, len(xlabels)-1, min(len(xlabels), 20)).astype(int))
+    ys = np.unique(np.linspace(0, len(ylabels)-1, min(len(ylabels), 24)).astype(int))
+    ax.set_xticks(xs, [xlabels[i] for i in xs], rotation=45, ha="right"); ax.set_yticks(ys, [ylabels[i] for i in ys])
+    ax.set_title(title); ax.set_xlabel(xlabel); ax.set_ylabel(ylabel); fig.tight_layout()
+    return to_png(fig)
+
+def report(eq_x, eq, dd_x, dd, day_x, day_pnl, summary_lines, perf_lines, dates: bool = False) -> bytes:
+    """Equity, drawdown and (with timestamps) daily PnL panels on one x-axis, plus the summary tables."""
+    ratios = [3, 1.6, 1.6] if day_x is not None else [3, 1.6]
+    fig = figure("report")
+    gs = fig.add_gridspec(len(ratios), 1, height_ratios=ratios, left=0.11, right=0.97, top=0.97, bottom=0.26, hspace=0.08)
+    ax_eq = fig.add_subplot(gs[0]); ax_dd = fig.add_subplot(gs[1], sharex=ax_eq)
+    ax_eq.plot(eq_x, eq); ax_eq.set_ylabel("Equity")
+    ax_dd.fill_between(dd_x, dd, 0, color="tab:red", alpha=0.4, linewidth=0); ax_dd.set_ylabel("Drawdown")
+    axes = [ax_eq, ax_dd]
+    if day_x is not None:
+        ax_day = fig.add_subplot(gs[2], sharex=ax_eq)
+        ax_day.bar(day_x, day_pnl, width=1.0, color=np.where(np.asarray(day_pnl) >= 0, "tab:green", "tab:red"))
+        ax_day.set_ylabel("Daily PnL"); axes.append(ax_day)
+    for ax in axes[:-1]:
+        ax.tick_params(labelbottom=False)
+    axes[-1].set_xlabel("Date" if dates else "Trade #")
+    if dates:
+        for lbl in axes[-1].get_xticklabels():
+            lbl.set_rotation(30); lbl.set_ha("right")
+    # summary tables under the shared axis
+    fig.text(0.04, 0.17, "\n".join(summary_lines), family="monospace", fontsize=8, va="top")
+    fig.text(0.34, 0.17, "\n".join(perf_lines), family="monospace", fontsize=6.5, va="top")
+    return to_png(fig)
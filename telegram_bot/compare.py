@@ -0,0 +1,53 @@
+import os, threading
+from concurrent.futures import ThreadPoolExecutor
+from .dataset import load_dataset
+from .metrics import summarize
+
+# Named trade files for /compare; COMPARE_DATASETS="name=path;name2=path2" replaces the defaults.
+DEFAULT_DATASETS = {
+    "trades": "trades.csv",
+    "data_trades": os.path.join("data", "trades.csv"),
+    "trade_log": "trade_log.csv",
+    "backtest": "backtest.csv",
+    "uploaded": "uploaded_backtest.csv",
+}
+
+_THREADS = None
+_LOCK = threading.Lock()
+
+def _threads() -> ThreadPoolExecutor:
+    global _THREADS
+    with _LOCK:
+        if _THREADS is None:
+            _THREADS = ThreadPoolExecutor(max_workers=int(os.environ.get("COMPARE_WORKERS", "4")), thread_name_prefix="compare")
+        return _THREADS
+
+def catalog(current_path: str = None) -> dict:
+    raw = os.environ.get("COMPARE_DATASETS", "").strip()
+    if raw:
+        out = {}
+        for part in raw.split(";"):
+            if "=" in part:
+                k, v = part.split("=", 1)
+                out[k.strip().lower()] = v.strip()
+    else:
+        out = dict(DEFAULT_DATASETS)
+    if current_path and os.path.abspath(current_path) not in {os.path.abspath(p) for p in out.values()}:
+        out = {"current": current_path, **out}
+    return out
+
+def _one(name: str, path: str):
+    ds = load_dataset(path)
+    if ds is None or not ds.pcol:
+        return name, None, None
+    # metrics live on the cached Dataset, so unchanged files are never re-read or re-summarised
+    return name, ds.memo("summary", lambda: summarize(ds.pnl)), ds
+
+def compare(datasets: dict, sort: str = "pnl"):
+    """Load every named dataset concurrently; returns (ranked [(name, metrics, ds)], skipped names)."""
+    futs = [_threads().submit(_one, n, p) for n, p in datasets.items()]
+    done = [f.result() for f in futs]
+    ok = [d for d in done if d[1] is not None]
+    skipped = [d[0] for d in done if d[1] is None]
+    ok.sort(key=lambda d: d[1].get(sort, d[1]["pnl"]), reverse=True)
+    return ok, skipped
@@ -0,0 +1,29 @@
+import numpy as np
+from .grouping import bincount2d, top_n
+
+def daily_corr(ds, mask, top: int = 20):
+    """(symbol names, corr matrix) of daily PnL for the `top` most traded symbols under mask."""
+    m = mask & ds.tvalid
+    if not m.any():
+        return [], np.zeros((0, 0))
+    day = ds.epoch[m] // 86400; day = day - day.min()
+    sym = ds.sym_codes[m]
+    counts = np.bincount(sym, minlength=len(ds.sym_names))
+    keep = top_n(counts, top, present=counts > 0)
+    remap = np.full(len(ds.sym_names), -1, dtype=np.int64); remap[keep] = np.arange(keep.size)
+    col = remap[sym]; sel = col >= 0
+    grid = bincount2d(day[sel], col[sel], int(day.max()) + 1, keep.size, ds.pnl[m][sel])
+    if keep.size < 2 or grid.shape[0] < 2:
+        return [str(x) for x in ds.sym_names[keep]], np.ones((keep.size, keep.size))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = np.corrcoef(grid, rowvar=False)
+    return [str(x) for x in ds.sym_names[keep]], np.nan_to_num(corr)
+
+def top_pairs(names, corr, k: int = 5):
+    """k most positively correlated symbol pairs as (a, b, rho)."""
+    if len(names) < 2:
+        return []
+    i, j = np.triu_indices(len(names), k=1)
+    vals = corr[i, j]
+    order = top_n(vals, k)
+    return [(names[i[o]], names[j[o]], float(vals[o])) for o in order]
@@ -0,0 +1,147 @@
+import os, threading
+import numpy as np
+import pandas as pd
+
+HOLD_PAIRS = [
+    ("open_time", "close_time"), ("entry_time", "exit_time"), ("opened_at", "closed_at"),
+    ("open_date", "close_date"), ("entry_date", "exit_date"), ("created_at", "closed_at"),
+]
+
+# Parsed trades cached per file version (path, mtime, size) so commands share one parse.
+_CACHE = {}
+_LOCK = threading.Lock()
+
+class Dataset:
+    def __init__(self, path: str, version: tuple, df: pd.DataFrame, pcol, tcol, scol, times):
+        self.path = path; self.version = version
+        self.df = df; self.pcol = pcol; self.tcol = tcol; self.scol = scol
+        self.pnl = pd.to_numeric(df[pcol], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64) if pcol else np.zeros(len(df))
+        self.times = times
+        if times is not None:
+            self.tvalid = times.notna().to_numpy()
+            self.epoch = times.to_numpy(dtype="datetime64[ns]").astype("datetime64[s]").astype(np.int64)
+        else:
+            self.tvalid = np.zeros(len(df), dtype=bool)
+            self.epoch = np.zeros(len(df), dtype=np.int64)
+        if scol:
+            codes, names = pd.factorize(df[scol].astype(str).str.upper())
+            self.sym_codes = codes.astype(np.int64); self.sym_names = np.asarray(names, dtype=object)
+        else:
+            self.sym_codes = np.zeros(len(df), dtype=np.int64); self.sym_names = np.asarray(["ALL"], dtype=object)
+        self._memo = {}
+
+    def __len__(self):
+        return self.pnl.shape[0]
+
+    def symbol_mask(self, symbol):
+        if not symbol:
+            return np.ones(len(self), dtype=bool)
+        hit = np.flatnonzero(self.sym_names == str(symbol).strip().upper())
+        if not self.scol or hit.size == 0:
+            return np.zeros(len(self), dtype=bool)
+        return self.sym_codes == hit[0]
+
+    @property
+    def hour(self):
+        return self.memo("hour", lambda: (self.epoch // 3600) % 24)
+
+    @property
+    def weekday(self):
+        # 0=Mon .. 6=Sun; 1970-01-01 was a Thursday
+        return self.memo("weekday", lambda: (self.epoch // 86400 + 3) % 7)
+
+    @property
+    def notional(self):
+        """|qty| * price per trade when the file carries both, else None."""
+        def build():
+            from .fills import QTY_CANDIDATES, PRICE_CANDIDATES, _named
+            qcol = _named(self.df, ["closed_qty"] + QTY_CANDIDATES); pcol = _named(self.df, PRICE_CANDIDATES)
+            if qcol is None or pcol is None:
+                return None
+            q = pd.to_numeric(self.df[qcol], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+            p = pd.to_numeric(self.df[pcol], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+            return np.abs(q) * p
+        return self.memo("notional", build)
+
+    @property
+    def hold(self):
+        """(open epoch s, close epoch s, valid mask) from an open/close column pair or fill holding times, else None."""
+        return self.memo("hold", self._build_hold)
+
+    def _build_hold(self):
+        from . import _parse_maybe_datetime
+        low = {str(c).strip().lower(): c for c in self.df.columns}
+        for a, b in HOLD_PAIRS:
+            if a in low and b in low:
+                ta = _utc_naive(pd.to_datetime(_parse_maybe_datetime(self.df[low[a]]), errors="coerce"))
+                tb = _utc_naive(pd.to_datetime(_parse_maybe_datetime(self.df[low[b]]), errors="coerce"))
+                ok = (ta.notna() & tb.notna()).to_numpy()
+                if ok.sum() >= max(1, len(self) // 2):
+                    start = ta.to_numpy(dtype="datetime64[ns]").astype("datetime64[s]").astype(np.int64)
+                    end = tb.to_numpy(dtype="datetime64[ns]").astype("datetime64[s]").astype(np.int64)
+                    return start, end, ok & (end >= start)
+        if "holding_s" in low and self.tvalid.any():
+            h = pd.to_numeric(self.df[low["holding_s"]], errors="coerce").to_numpy(dtype=np.float64)
+            ok = self.tvalid & np.isfinite(h) & (h >= 0)
+            return self.epoch - np.nan_to_num(h).astype(np.int64), self.epoch, ok
+        return None
+
+    def time_sorted(self):
+        """(order, pnl, epoch) in time order, dropping rows without a valid time.
+
+        Without any timestamps this is file order; order is None and the arrays are the originals (no copy)
+        whenever no reordering is needed.
+        """
+        def build():
+            e = self.epoch; v = self.tvalid
+            if not v.any() or (v.all() and (e.size < 2 or (np.diff(e) >= 0).all())):
+                return None, self.pnl, e
+            idx = np.flatnonzero(v)
+            order = idx[np.argsort(e[idx], kind="stable")]
+            return order, self.pnl[order], e[order]
+        return self.memo("time_sorted", build)
+
+    def memo(self, key, fn):
+        """Return fn() computed once for this dataset version."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            val = self._memo[key] = fn()
+            return val
+
+def _utc_naive(times: pd.Series) -> pd.Series:
+    if getattr(times.dt, "tz", None) is not None:
+        return times.dt.tz_convert("UTC").dt.tz_localize(None)
+    return times
+
+def file_version(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+def load_dataset(path: str):
+    """Cached Dataset for path, or None when the file is missing or empty."""
+    from . import _parse_trades, _auto_profit_col, _auto_time_col, _auto_symbol_col, _parse_maybe_datetime
+    version = file_version(path)
+    if version is None:
+        return None
+    with _LOCK:
+        ds = _CACHE.get(path)
+        if ds is not None and ds.version == version:
+            return ds
+    df = _parse_trades(path)
+    if df.empty:
+        return None
+    pcol = _auto_profit_col(df); tcol = _auto_time_col(df); scol = _auto_symbol_col(df)
+    times = None
+    if tcol:
+        try:
+            times = _utc_naive(pd.to_datetime(_parse_maybe_datetime(df[tcol]), errors="coerce"))
+        except Exception:
+            times = None
+    ds = Dataset(path, version, df, pcol, tcol, scol, times)
+    with _LOCK:
+        _CACHE[path] = ds
+    return ds
@@ -0,0 +1,20 @@
+import os
+import numpy as np
+
+# Line charts are ~800 px wide: keep each bucket's min and max so peaks and drawdowns survive exactly.
+MAX_POINTS = int(os.environ.get("PLOT_MAX_POINTS", "4000"))
+
+def minmax(x, y, max_points: int = MAX_POINTS):
+    """(x, y) reduced to at most ~max_points by keeping the min and max of each equal-size bucket, in order."""
+    y = np.asarray(y)
+    x = np.arange(y.shape[0]) if x is None else np.asarray(x)
+    n = y.shape[0]
+    if n <= max_points or max_points < 4:
+        return x, y
+    nb = (max_points - 2) // 2
+    size = -(-n // nb)
+    pad = np.concatenate((y, np.repeat(y[-1:], nb * size - n))).reshape(nb, size)
+    base = np.arange(nb) * size
+    lo = base + pad.argmin(axis=1); hi = base + pad.argmax(axis=1)
+    idx = np.unique(np.concatenate(([0, n - 1], np.minimum(lo, n - 1), np.minimum(hi, n - 1))))
+    return x[idx], y[idx]
@@ -0,0 +1,81 @@
+import hashlib, json, os, threading
+from collections import OrderedDict
+
+# Telegram file_id per (bot, content hash, kind): re-sending a known artefact skips the upload.
+FILE_ID_CACHE = os.environ.get("FILE_ID_CACHE", "file_ids.json")
+MAX_ENTRIES = int(os.environ.get("FILE_ID_MAX", "2000"))
+
+class FileIdCache:
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+        self.path = path; self.max_entries = max_entries
+        self._lock = threading.Lock(); self._loaded = False
+        self._ids = OrderedDict(); self._file_hashes = {}
+        self.hits = 0; self.misses = 0
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path) as f:
+                self._ids.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._ids, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print("file_id cache save warning:", e)
+
+    @staticmethod
+    def _ns():
+        # file_ids are only valid for the bot that received them
+        return (os.environ.get("TELEGRAM_BOT_TOKEN") or "").split(":", 1)[0]
+
+    def key(self, data: bytes, kind: str) -> str:
+        return f"{self._ns()}:{kind}:{hashlib.sha1(data).hexdigest()}"
+
+    def file_key(self, path: str, kind: str) -> str:
+        """key() for a file on disk; the hash is recomputed only when mtime/size change."""
+        st = os.stat(path)
+        ver = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            hit = self._file_hashes.get(path)
+        if hit is None or hit[0] != ver:
+            h = hashlib.sha1()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+            hit = (ver, h.hexdigest())
+            with self._lock:
+                self._file_hashes[path] = hit
+        return f"{self._ns()}:{kind}:{hit[1]}"
+
+    def get(self, key: str):
+        with self._lock:
+            self._load()
+            fid = self._ids.get(key)
+            if fid is None:
+                self.misses += 1
+            else:
+                self._ids.move_to_end(key); self.hits += 1
+            return fid
+
+    def put(self, key: str, file_id: str):
+        with self._lock:
+            self._load()
+            self._ids[key] = file_id; self._ids.move_to_end(key)
+            while len(self._ids) > self.max_entries:
+                self._ids.popitem(last=False)
+            self._save()
+
+    def drop(self, key: str):
+        with self._lock:
+            if self._ids.pop(key, None) is not None:
+                self._save()
+
+FILE_IDS = FileIdCache(FILE_ID_CACHE)
@@ -0,0 +1,179 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Raw exchange fills (side, qty, price) -> realised PnL per closing fill, holding time and open exposure.
+SIDE_CANDIDATES = ["side", "direction", "action", "buy/sell", "type", "order_side"]
+QTY_CANDIDATES = ["qty", "quantity", "amount", "size", "volume", "filled", "filled_qty", "executed_qty", "exec_qty"]
+PRICE_CANDIDATES = ["price", "fill_price", "exec_price", "avg_price", "executed_price", "deal_price"]
+BUY_WORDS = ("buy", "b", "long", "bid")
+SELL_WORDS = ("sell", "s", "short", "ask")
+FILL_MATCHING = os.environ.get("FILL_MATCHING", "fifo").strip().lower()
+
+def _named(df: pd.DataFrame, names):
+    low = {str(c).strip().lower(): c for c in df.columns}
+    for n in names:
+        if n in low:
+            return low[n]
+    return None
+
+def fill_columns(df: pd.DataFrame):
+    """(side, qty, price) column names when df looks like raw fills, else None. side may be None for signed qty."""
+    qty = _named(df, QTY_CANDIDATES); price = _named(df, PRICE_CANDIDATES)
+    if qty is None or price is None:
+        return None
+    side = _named(df, SIDE_CANDIDATES)
+    if side is not None:
+        words = df[side].dropna().astype(str).str.strip().str.lower().unique()
+        if not len(words) or not set(words) <= set(BUY_WORDS + SELL_WORDS):
+            side = None
+    if side is None and not (pd.to_numeric(df[qty], errors="coerce") < 0).any():
+        return None
+    return side, qty, price
+
+def _signed_qty(df, side, qty):
+    q = pd.to_numeric(df[qty], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    if side is None:
+        return q
+    s = df[side].astype(str).str.strip().str.lower()
+    sign = np.where(s.isin(SELL_WORDS).to_numpy(), -1.0, np.where(s.isin(BUY_WORDS).to_numpy(), 1.0, 0.0))
+    return np.abs(q) * sign
+
+def _group_cumsum(x, group):
+    """Inclusive cumsum of x restarted wherever the (sorted, contiguous) group id changes."""
+    cs = np.cumsum(x)
+    if x.size == 0:
+        return cs
+    start = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    base = (cs[start] - x[start])
+    return cs - np.repeat(base, np.diff(np.r_[start, x.size]))
+
+def _first_index(group, n_groups):
+    first = np.full(n_groups, -1, dtype=np.int64)
+    u, idx = np.unique(group, return_index=True)
+    first[u] = idx
+    return first
+
+def _affine_scan(a, b):
+    """Inclusive scan of x_i = a_i * x_{i-1} + b_i (x_{-1} = 0) by log2(n) doubling steps.
+
+    With 0 <= a <= 1 every partial result is a convex-style blend of the b's, so nothing over- or underflows.
+    """
+    a = np.asarray(a, dtype=np.float64).copy(); x = np.asarray(b, dtype=np.float64).copy()
+    shift = 1
+    while shift < x.size:
+        x[shift:] = a[shift:] * x[:-shift] + x[shift:]
+        a[shift:] = a[shift:] * a[:-shift]
+        shift *= 2
+    return x
+
+def reconstruct(df: pd.DataFrame, side, qty, price, tcol=None, scol=None, method: str = None):
+    """Match fills per symbol (FIFO or average cost).
+
+    Returns (closes, positions): one row per closing fill with realised PnL, entry price and holding
+    time, and one row per symbol with the remaining open quantity and its cost basis.
+    """
+    method = (method or FILL_MATCHING)
+    n = len(df)
+    sym_raw = df[scol].astype(str).str.upper() if scol else pd.Series(["ALL"] * n, index=df.index)
+    codes, names = pd.factorize(sym_raw)
+    if tcol:
+        from . import _parse_maybe_datetime
+        t = pd.to_datetime(_parse_maybe_datetime(df[tcol]), errors="coerce")
+        tsec = t.to_numpy(dtype="datetime64[ns]").astype("datetime64[s]").astype(np.int64).astype(np.float64)
+        tsec[t.isna().to_numpy()] = np.nan
+        order = np.lexsort((np.nan_to_num(tsec, nan=np.inf), codes))
+    else:
+        tsec = np.full(n, np.nan)
+        order = np.argsort(codes, kind="stable")
+    s = _signed_qty(df, side, qty)[order]
+    p = pd.to_numeric(df[price], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)[order]
+    g = codes[order].astype(np.int64); ts = tsec[order]
+    pos = _group_cumsum(s, g); prev = pos - s
+    opposite = (np.sign(s) * np.sign(prev)) < 0
+    close_q = np.where(opposite, np.minimum(np.abs(s), np.abs(prev)), 0.0)
+    open_q = np.abs(s) - close_q
+
+    # split every fill into a close leg and/or an open leg (close first), in fill order
+    rows = np.arange(n)
+    leg_row = np.concatenate((rows[close_q > 0], rows[open_q > 0]))
+    leg_open = np.concatenate((np.zeros(int((close_q > 0).sum()), bool), np.ones(int((open_q > 0).sum()), bool)))
+    k = np.lexsort((leg_open, leg_row)); leg_row = leg_row[k]; leg_open = leg_open[k]
+    lq = np.where(leg_open, open_q[leg_row], close_q[leg_row]); lp = p[leg_row]; lt = ts[leg_row]
+    # an open leg starts a new episode when the position before it is flat
+    flat_before = np.where(leg_open, np.where(opposite[leg_row], True, prev[leg_row] == 0), False)
+    ep = np.cumsum(flat_before) - 1
+    n_ep = int(ep.max()) + 1 if ep.size else 0
+    ep_dir = np.zeros(n_ep); ep_sym = np.zeros(n_ep, dtype=np.int64)
+    if n_ep:
+        fo = _first_index(ep, n_ep)
+        ep_dir = np.sign(s[leg_row[fo]]); ep_sym = g[leg_row[fo]]
+        lt = lt - lt[fo][ep]  # seconds since the episode opened keeps the time cumsums small
+    op = np.flatnonzero(leg_open); cl = np.flatnonzero(~leg_open)
+    oq, cq = lq[op], lq[cl]
+
+    if method.startswith("avg"):
+        # average cost: closes leave the average price A unchanged and each open sets
+        # A = a*A_prev + (1-a)*price with a = rem/(rem+q), so A along the opens is an affine scan.
+        # a is 0 at every episode's first open, which restarts the scan without segmenting it.
+        row_o = leg_row[op]
+        rem_o = np.where(opposite[row_o], 0.0, np.abs(prev[row_o]))
+        a = np.zeros(oq.size); nz = oq > 0
+        a[nz] = rem_o[nz] / (rem_o[nz] + oq[nz])
+        avg_p = _affine_scan(a, (1.0 - a) * lp[op])
+        avg_t = _affine_scan(a, (1.0 - a) * np.nan_to_num(lt[op]))
+        # each close is priced at the latest open before it (always in its own episode)
+        last_open = np.maximum.accumulate(np.where(leg_open, np.arange(lq.size), -1))
+        k_open = np.searchsorted(op, last_open[cl])
+        entry = avg_p[k_open]; entry_t = avg_t[k_open]
+    else:
+        # FIFO: closes consume the episode's opening lots in order; cumulative cost along the opening
+        # quantity axis is piecewise linear, so np.interp prices any consumed [from, to) range.
+        qo = np.r_[0.0, np.cumsum(oq)]
+        fo_cost = np.r_[0.0, np.cumsum(oq * lp[op])]
+        fo_time = np.r_[0.0, np.cumsum(oq * np.nan_to_num(lt[op]))]
+        kc = np.cumsum(cq)
+        open_base = qo[:-1][_first_index(ep[op], n_ep)] if n_ep else np.zeros(0)
+        cf = _first_index(ep[cl], n_ep)
+        close_base = np.zeros(n_ep); has = cf >= 0
+        close_base[has] = (kc - cq)[cf[has]]
+        x_to = kc - close_base[ep[cl]] + open_base[ep[cl]]; x_from = x_to - cq
+        with np.errstate(divide="ignore", invalid="ignore"):
+            entry = (np.interp(x_to, qo, fo_cost) - np.interp(x_from, qo, fo_cost)) / cq
+            entry_t = (np.interp(x_to, qo, fo_time) - np.interp(x_from, qo, fo_time)) / cq
+
+    d = ep_dir[ep[cl]]
+    realized = d * cq * (lp[cl] - entry)
+    holding = lt[cl] - entry_t
+    src = order[leg_row[cl]]
+    # matching ran per symbol; hand the closes back in the file's fill order
+    k = np.argsort(src, kind="stable")
+    closes = df.iloc[src[k]].copy()
+    closes["closed_qty"] = cq[k]
+    closes["entry_price"] = entry[k]
+    closes["realized_pnl"] = realized[k]
+    closes["holding_s"] = holding[k]
+    closes = closes.reset_index(drop=True)
+
+    # open exposure: remaining quantity of each symbol's last episode
+    last_pos = np.zeros(len(names))
+    if n:
+        last = np.r_[np.flatnonzero(g[1:] != g[:-1]), n - 1]
+        last_pos[g[last]] = pos[last]
+    open_sum = np.bincount(ep[op], weights=oq, minlength=n_ep); close_sum = np.bincount(ep[cl], weights=cq, minlength=n_ep)
+    remaining = open_sum - close_sum
+    live = np.flatnonzero(remaining > 1e-12)
+    if method.startswith("avg"):
+        last_open_ep = np.full(n_ep, -1, dtype=np.int64)
+        last_open_ep[ep[op]] = np.arange(op.size)  # later opens overwrite earlier ones
+        basis = np.zeros(n_ep); has_open = last_open_ep >= 0
+        basis[has_open] = avg_p[last_open_ep[has_open]] * remaining[has_open]
+    else:
+        # FIFO keeps the newest lots: the unconsumed tail of the episode's opening range
+        lo = open_base + close_sum; hi = open_base + open_sum
+        basis = np.interp(hi, qo, fo_cost) - np.interp(lo, qo, fo_cost)
+    avg_cost = np.zeros(len(names))
+    avg_cost[ep_sym[live]] = basis[live] / remaining[live]
+    positions = pd.DataFrame({"symbol": np.asarray(names, dtype=object), "qty": last_pos, "avg_cost": avg_cost})
+    positions = positions[positions["qty"].abs() > 1e-12].reset_index(drop=True)
+    return closes, positions
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+def factorize(values):
+    """(int64 codes, names) for a column; NaN becomes its own 'nan' group."""
+    codes, names = pd.factorize(pd.Series(values).astype(str))
+    return codes.astype(np.int64), np.asarray(names, dtype=object)
+
+def group_stats(codes, r, n_groups: int) -> dict:
+    """Per-group trades, PnL, avg, win%, profit factor, max drawdown and best/worst trade.
+
+    Sums come from weighted np.bincount; order-dependent stats use one stable sort of the codes
+    (trade order kept inside each group) and ufunc.reduceat over the contiguous group slices.
+    """
+    r = np.asarray(r, dtype=np.float64); codes = np.asarray(codes, dtype=np.int64)
+    count = np.bincount(codes, minlength=n_groups)
+    pnl = np.bincount(codes, weights=r, minlength=n_groups)
+    wins = np.bincount(codes[r > 0], minlength=n_groups)
+    gross_win = np.bincount(codes, weights=np.where(r > 0, r, 0.0), minlength=n_groups)
+    gross_loss = np.bincount(codes, weights=np.where(r < 0, -r, 0.0), minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(count > 0, pnl / np.maximum(count, 1), 0.0)
+        win_pct = np.where(count > 0, wins * 100.0 / np.maximum(count, 1), 0.0)
+        pf = np.where(gross_loss > 0, gross_win / gross_loss, np.where(gross_win > 0, np.inf, 0.0))
+    best = np.zeros(n_groups); worst = np.zeros(n_groups); maxdd = np.zeros(n_groups)
+    present = np.flatnonzero(count)
+    if present.size:
+        order = np.argsort(codes, kind="stable")
+        rs = r[order]
+        starts = np.concatenate(([0], np.cumsum(count[present])[:-1]))
+        best[present] = np.maximum.reduceat(rs, starts)
+        worst[present] = np.minimum.reduceat(rs, starts)
+        # per-group equity (cumsum restarted at each group start)
+        cs = np.cumsum(rs)
+        eq = cs - np.repeat(cs[starts] - rs[starts], count[present])
+        # lift each group above every earlier one so a single running max never leaks across groups
+        lo = np.minimum(np.minimum.reduceat(eq, starts), 0.0)
+        hi = np.maximum(np.maximum.reduceat(eq, starts), 0.0)
+        shift = np.concatenate(([0.0], np.cumsum(hi - lo)[:-1])) - lo
+        lifted = eq + np.repeat(shift, count[present])
+        peak = np.maximum(np.maximum.accumulate(lifted), np.repeat(shift, count[present]))
+        maxdd[present] = np.minimum.reduceat(lifted - peak, starts)
+    return {"count": count, "pnl": pnl, "avg": avg, "win_pct": win_pct, "pf": pf,
+            "maxdd": maxdd, "best": best, "worst": worst}
+
+def top_n(values, k: int, present=None):
+    """Indices of the k largest values (descending) via np.argpartition; skips groups where present is False."""
+    values = np.asarray(values, dtype=np.float64)
+    idx = np.arange(values.shape[0]) if present is None else np.flatnonzero(present)
+    if idx.size == 0 or k <= 0:
+        return idx[:0]
+    k = min(k, idx.size)
+    part = idx[np.argpartition(-values[idx], k - 1)[:k]]
+    return part[np.argsort(-values[part], kind="stable")]
+
+def bincount2d(row_codes, col_codes, n_rows: int, n_cols: int, weights=None):
+    """Dense (n_rows, n_cols) sums of weights (or counts) from one flat np.bincount."""
+    flat = np.asarray(row_codes, dtype=np.int64) * n_cols + np.asarray(col_codes, dtype=np.int64)
+    return np.bincount(flat, weights=weights, minlength=n_rows * n_cols).reshape(n_rows, n_cols)
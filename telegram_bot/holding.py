@@ -0,0 +1,22 @@
+import numpy as np
+
+# Holding-duration buckets (seconds) and open-position concurrency from start/end events.
+BUCKETS = [(300, "<5m"), (1800, "5-30m"), (7200, "30m-2h"), (28800, "2-8h"), (86400, "8-24h"), (259200, "1-3d"), (np.inf, ">3d")]
+
+def by_duration(dur, r) -> dict:
+    edges = np.array([b for b, _ in BUCKETS[:-1]], dtype=np.float64)
+    idx = np.digitize(dur, edges, right=False)
+    k = len(BUCKETS)
+    return {
+        "label": [lab for _, lab in BUCKETS],
+        "count": np.bincount(idx, minlength=k),
+        "pnl": np.bincount(idx, weights=r, minlength=k),
+        "wins": np.bincount(idx[r > 0], minlength=k),
+    }
+
+def concurrency(start, end):
+    """(event times, open positions after each event) from one sort of +1/-1 events; closes sort before opens at ties."""
+    t = np.concatenate((start, end))
+    delta = np.concatenate((np.ones(start.size, dtype=np.int64), -np.ones(end.size, dtype=np.int64)))
+    order = np.lexsort((delta, t))
+    return t[order], np.cumsum(delta[order])
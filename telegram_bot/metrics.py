@@ -0,0 +1,78 @@
+import numpy as np
+
+# Common per-sequence metric set shared by /whatif, /compare, batch analysis and walk-forward.
+METRIC_LABELS = [
+    ("trades", "Trades"), ("pnl", "PnL"), ("win_pct", "Win%"), ("avg", "Avg"),
+    ("pf", "PF"), ("maxdd", "MaxDD"), ("best", "Best"), ("worst", "Worst"),
+]
+
+def max_drawdown(r) -> float:
+    """Deepest peak-to-trough fall of the cumulative PnL, starting from 0 equity (<= 0)."""
+    r = np.asarray(r, dtype=np.float64)
+    if not r.size:
+        return 0.0
+    eq = np.cumsum(r)
+    peak = np.maximum(np.maximum.accumulate(eq), 0.0)
+    return float((eq - peak).min())
+
+def summarize(r) -> dict:
+    r = np.asarray(r, dtype=np.float64)
+    n = int(r.size)
+    if not n:
+        return {"trades": 0, "pnl": 0.0, "win_pct": 0.0, "avg": 0.0, "pf": 0.0, "maxdd": 0.0,
+                "best": 0.0, "worst": 0.0, "sharpe": 0.0}
+    gross_win = float(r[r > 0].sum()); gross_loss = float(-r[r < 0].sum())
+    std = float(r.std(ddof=1)) if n > 1 else 0.0
+    return {
+        "trades": n,
+        "pnl": float(r.sum()),
+        "win_pct": float((r > 0).mean() * 100.0),
+        "avg": float(r.mean()),
+        "pf": gross_win / gross_loss if gross_loss > 0 else (float("inf") if gross_win > 0 else 0.0),
+        "maxdd": max_drawdown(r),
+        "best": float(r.max()),
+        "worst": float(r.min()),
+        "sharpe": float(r.mean() / std * np.sqrt(n)) if std > 0 else 0.0,  # per-trade, scaled by sqrt(trades)
+    }
+
+def fmt_metric(key: str, val) -> str:
+    if key == "trades":
+        return f"{int(val)}"
+    if key == "pf":
+        return "inf" if np.isinf(val) else f"{val:.2f}"
+    if key == "win_pct":
+        return f"{val:.1f}%"
+    return f"{val:.2f}"
+
+def summarize_rows(mat) -> dict:
+    """summarize() for every row of a 2-D array at once (rows are independent trade sequences)."""
+    mat = np.asarray(mat, dtype=np.float64)
+    n = mat.shape[1]
+    pos = np.where(mat > 0, mat, 0.0).sum(axis=1); neg = -np.where(mat < 0, mat, 0.0).sum(axis=1)
+    eq = np.cumsum(mat, axis=1)
+    peak = np.maximum(np.maximum.accumulate(eq, axis=1), 0.0)
+    std = mat.std(axis=1, ddof=1) if n > 1 else np.zeros(mat.shape[0])
+    avg = mat.mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pf = np.where(neg > 0, pos / neg, np.where(pos > 0, np.inf, 0.0))
+        sharpe = np.where(std > 0, avg / std * np.sqrt(n), 0.0)
+    return {
+        "trades": np.full(mat.shape[0], n), "pnl": eq[:, -1], "win_pct": (mat > 0).mean(axis=1) * 100.0,
+        "avg": avg, "pf": pf, "maxdd": (eq - peak).min(axis=1), "best": mat.max(axis=1),
+        "worst": mat.min(axis=1), "sharpe": sharpe,
+    }
+
+def walk_forward(r, folds: int = 5, train: int = 1) -> dict:
+    """Rolling walk-forward over equal segments: fold k trains on segments [k, k+train) and tests on k+train.
+
+    The oldest len(r) % segment trades are dropped; train/test windows are strided views of r (no copies).
+    """
+    r = np.asarray(r, dtype=np.float64)
+    seg = r.shape[0] // (folds + train)
+    if folds < 1 or train < 1 or seg < 2:
+        raise ValueError("not enough trades for that many folds")
+    offset = r.shape[0] - seg * (folds + train)
+    tail = r[offset:]
+    train_w = np.lib.stride_tricks.sliding_window_view(tail, train * seg)[::seg][:folds]
+    test_w = tail[train * seg:].reshape(folds, seg)
+    return {"seg": seg, "offset": offset, "train": summarize_rows(train_w), "test": summarize_rows(test_w)}
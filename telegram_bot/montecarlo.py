@@ -0,0 +1,66 @@
+import os
+import numpy as np
+from .procpool import pool_size, run_tasks
+
+# Cells (paths x trades) materialised at once per batch; bounds worker memory to a few arrays of this size.
+MAX_CELLS = int(os.environ.get("MC_MAX_CELLS", "2000000"))
+MAX_RUNS = int(os.environ.get("MC_MAX_RUNS", "100000"))
+FAN_POINTS = 200
+# Paths kept for the fan percentiles; caps what workers send back at FAN_RUNS x FAN_POINTS floats (~16 MB).
+FAN_RUNS = int(os.environ.get("MC_FAN_RUNS", "10000"))
+PCTS = (5, 25, 50, 75, 95)
+
+def _resample_idx(rng, rows: int, n: int, block: int):
+    if block <= 1:
+        return rng.integers(0, n, size=(rows, n))
+    # circular block bootstrap: k blocks of `block` consecutive trades, trimmed to n
+    k = -(-n // block)
+    starts = rng.integers(0, n, size=(rows, k, 1))
+    return ((starts + np.arange(block)) % n).reshape(rows, k * block)[:, :n]
+
+def _simulate_chunk(r, runs: int, block: int, seed, cols, fan_rows: int):
+    rng = np.random.default_rng(seed)
+    n = r.shape[0]
+    step = max(1, MAX_CELLS // n)
+    final = np.empty(runs); maxdd = np.empty(runs); fan = np.empty((fan_rows, len(cols)))
+    for lo in range(0, runs, step):
+        hi = min(runs, lo + step)
+        paths = r[_resample_idx(rng, hi - lo, n, block)]
+        np.cumsum(paths, axis=1, out=paths)
+        peak = np.maximum.accumulate(paths, axis=1)
+        np.maximum(peak, 0.0, out=peak)  # equity starts at 0
+        np.subtract(paths, peak, out=peak)
+        final[lo:hi] = paths[:, -1]
+        maxdd[lo:hi] = peak.min(axis=1)
+        if lo < fan_rows:  # paths are i.i.d., so the first fan_rows are an unbiased sample
+            top = min(hi, fan_rows)
+            fan[lo:top] = paths[: top - lo, cols]
+    return final, maxdd, fan
+
+def simulate(pnl, runs: int = 10000, block: int = 1, seed=None) -> dict:
+    r = np.ascontiguousarray(pnl, dtype=np.float64)
+    n = r.shape[0]
+    runs = int(min(max(runs, 1), MAX_RUNS)); block = int(min(max(block, 1), n))
+    cols = np.unique(np.linspace(0, n - 1, min(n, FAN_POINTS)).astype(np.int64))
+    seeds = np.random.SeedSequence(seed)
+    fan_runs = min(runs, max(FAN_RUNS, 1))
+    if runs * n <= MAX_CELLS:
+        parts = [_simulate_chunk(r, runs, block, seeds, cols, fan_runs)]
+    else:
+        k = min(runs, pool_size() * 4)
+        sizes = np.full(k, runs // k); sizes[: runs % k] += 1
+        fan_sizes = np.full(k, fan_runs // k); fan_sizes[: fan_runs % k] += 1
+        parts = run_tasks(_simulate_chunk, [(r, int(s), block, ss, cols, int(f))
+                                            for s, f, ss in zip(sizes, fan_sizes, seeds.spawn(k))])
+    final = np.concatenate([p[0] for p in parts])
+    maxdd = np.concatenate([p[1] for p in parts])
+    fan = np.concatenate([p[2] for p in parts])
+    return {
+        "runs": runs, "block": block, "trades": n,
+        "final": {p: float(v) for p, v in zip(PCTS, np.percentile(final, PCTS))},
+        "maxdd": {p: float(v) for p, v in zip(PCTS, np.percentile(maxdd, PCTS))},
+        "p_loss": float((final < 0).mean() * 100.0),
+        "steps": cols + 1,
+        "fan": np.percentile(fan, PCTS, axis=0),
+        "actual": np.cumsum(r)[cols],
+    }
@@ -0,0 +1,40 @@
+import os, threading, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# One shared pool per gunicorn worker; spawn avoids forking a process that already runs threads.
+_POOL = None
+_LOCK = threading.Lock()
+
+def pool_size() -> int:
+    try:
+        n = int(os.environ.get("POOL_WORKERS", "0"))
+    except ValueError:
+        n = 0
+    return n if n > 0 else max(1, min(4, os.cpu_count() or 1))
+
+def process_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=pool_size(), mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+def reset_pool():
+    global _POOL
+    with _LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
+
+def run_tasks(fn, arglist):
+    """Submit fn(*args) for every args tuple and return results in order; rebuilds a broken pool once."""
+    for attempt in (0, 1):
+        pool = process_pool()
+        try:
+            futs = [pool.submit(fn, *a) for a in arglist]
+            return [f.result() for f in futs]
+        except BrokenProcessPool:
+            reset_pool()
+            if attempt:
+                raise
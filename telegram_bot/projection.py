@@ -0,0 +1,54 @@
+import numpy as np
+
+# Compounding projection (port of server.js project()): balance_d = amount * growth ** d, no per-day loop.
+MAX_DAYS = 3650
+MAX_GRID = 200
+MAX_BALANCE = 1e15  # larger balances are reported as overflow rather than printed
+
+def growth_factor(daily_pct=None, per_trade_pct=None, trades_per_day=1):
+    """Per-day growth; perTrade mode compounds per_trade_pct over trades_per_day. Arguments broadcast."""
+    if per_trade_pct is not None:
+        return (1.0 + np.asarray(per_trade_pct, dtype=np.float64) / 100.0) ** np.asarray(trades_per_day, dtype=np.float64)
+    return 1.0 + np.asarray(daily_pct if daily_pct is not None else 0.0, dtype=np.float64) / 100.0
+
+def project(amount: float, days: int, growth: float) -> dict:
+    """Day-by-day rows {day, start, profit, end} as arrays."""
+    day = np.arange(1, int(days) + 1)
+    with np.errstate(over="ignore", invalid="ignore"):
+        start = amount * growth ** (day - 1)
+        end = start * growth
+        profit = end - start
+    return {"day": day, "start": start, "profit": profit, "end": end}
+
+def sweep(amount: float, growths, horizons) -> dict:
+    """Equity paths for every growth rate at once: paths[i, d-1] = amount * growths[i] ** d."""
+    g = np.asarray(growths, dtype=np.float64).reshape(-1, 1)
+    h = np.asarray(horizons, dtype=np.int64)
+    day = np.arange(1, int(h.max()) + 1)
+    with np.errstate(over="ignore", invalid="ignore"):
+        paths = amount * g ** day
+    return {"day": day, "paths": paths, "at": paths[:, h - 1]}
+
+def in_range(*arrays) -> bool:
+    """True when every value is finite and within +-MAX_BALANCE."""
+    return all(np.isfinite(a).all() and np.abs(a).max(initial=0.0) <= MAX_BALANCE for a in map(np.asarray, arrays))
+
+def parse_grid(text: str):
+    """'2' -> [2.]; '1,2,3' -> list; '0.5:3:0.5' -> inclusive range. Returns None when unparsable."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        if ":" in text:
+            parts = [float(x) for x in text.split(":")]
+            lo, hi = parts[0], parts[1]; step = parts[2] if len(parts) > 2 else 1.0
+            if step <= 0 or hi < lo:
+                return None
+            vals = lo + step * np.arange(int(np.floor((hi - lo) / step + 1e-9)) + 1)
+        else:
+            vals = np.array([float(x) for x in text.split(",") if x.strip()])
+    except ValueError:
+        return None
+    if vals.size == 0 or vals.size > MAX_GRID or not np.isfinite(vals).all():
+        return None
+    return vals
@@ -0,0 +1,34 @@
+import io, threading
+
+# Object-oriented chart rendering: no pyplot state, so handler threads can draw concurrently.
+# Each thread keeps one Figure (with its Agg canvas) per template and clears it between charts.
+# matplotlib itself is imported on the first chart, keeping it out of the bot's cold start.
+TEMPLATES = {
+    "line": {"figsize": (8, 4), "dpi": 100},
+    "grid": {"figsize": (8, 5), "dpi": 100},
+    "tall": {"figsize": (8, 6), "dpi": 100},
+    "report": {"figsize": (8, 11), "dpi": 100},
+}
+
+_local = threading.local()
+
+def figure(template: str = "line", figsize=None):
+    """Blank Figure for this thread; figsize overrides the template size for one chart."""
+    figs = _local.__dict__.setdefault("figs", {})
+    spec = TEMPLATES[template]
+    fig = figs.get(template)
+    if fig is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        fig = figs[template] = Figure(**spec)
+        FigureCanvasAgg(fig)
+    else:
+        fig.clear()
+    fig.set_size_inches(figsize or spec["figsize"])
+    return fig
+
+def to_png(fig) -> bytes:
+    out = io.BytesIO()
+    fig.savefig(out, format="png")
+    fig.clear()  # drop the artists (and their data) until the figure is reused
+    return out.getvalue()
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Hour/day/week/month PnL, count and win series built once per dataset version via integer epoch buckets.
+FREQS = ("hour", "day", "week", "month")
+
+def _bucket(epoch, freq: str):
+    if freq == "hour":
+        return epoch // 3600
+    day = epoch // 86400
+    if freq == "day":
+        return day
+    if freq == "week":
+        return (day + 3) // 7  # 1970-01-01 was a Thursday: shift so weeks start on Monday
+    return day.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+def _bucket_start(code, freq: str):
+    if freq == "hour":
+        return (code * 3600).astype("datetime64[s]")
+    if freq == "day":
+        return code.astype("datetime64[D]")
+    if freq == "week":
+        return (code * 7 - 3).astype("datetime64[D]")
+    return code.astype("datetime64[M]")
+
+def _series(epoch, r, freq: str) -> dict:
+    b = _bucket(epoch, freq)
+    lo = int(b.min()); c = b - lo; n = int(c.max()) + 1
+    return {
+        "start": _bucket_start(lo + np.arange(n, dtype=np.int64), freq),
+        "pnl": np.bincount(c, weights=r, minlength=n),
+        "count": np.bincount(c, minlength=n),
+        "wins": np.bincount(c[r > 0], minlength=n),
+    }
+
+def pyramid(ds, symbol=None) -> dict:
+    """{freq: {start, pnl, count, wins}} for the dataset (optionally one symbol); empty dict without timestamps."""
+    def build():
+        m = ds.tvalid & ds.symbol_mask(symbol)
+        if not m.any():
+            return {}
+        e = ds.epoch[m]; r = ds.pnl[m]
+        return {f: _series(e, r, f) for f in FREQS}
+    return ds.memo(("pyramid", (symbol or "").upper()), build)
+
+def time_profile(ds, mask) -> dict:
+    """PnL/count/wins by hour-of-day (24), weekday (7, Mon=0) and the 24x7 hour x weekday grid."""
+    m = mask & ds.tvalid
+    h = ds.hour[m]; w = ds.weekday[m]; r = ds.pnl[m]; win = r > 0
+    cell = h * 7 + w
+    grid = {
+        "pnl": np.bincount(cell, weights=r, minlength=168).reshape(24, 7),
+        "count": np.bincount(cell, minlength=168).reshape(24, 7),
+        "wins": np.bincount(cell[win], minlength=168).reshape(24, 7),
+    }
+    # the 1-D profiles are margins of the grid
+    return {
+        "grid": grid,
+        "hour": {k: v.sum(axis=1) for k, v in grid.items()},
+        "weekday": {k: v.sum(axis=0) for k, v in grid.items()},
+    }
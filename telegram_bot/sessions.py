@@ -0,0 +1,24 @@
+import re
+import numpy as np
+
+# Trading sessions: runs of trades separated by inactivity gaps, found in one pass over sorted epochs.
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+def parse_gap(text: str) -> int:
+    m = re.match(r"^(\d+(?:\.\d+)?)\s*([smhd]?)$", (text or "").strip().lower())
+    if not m:
+        raise ValueError(f"bad gap '{text}'")
+    return int(float(m.group(1)) * _UNITS[m.group(2) or "m"])
+
+def split_sessions(epoch, r, gap: int) -> dict:
+    """Per-session start/end epoch, trade count, PnL and wins; epoch must be sorted ascending."""
+    brk = np.diff(epoch) > gap
+    sid = np.concatenate(([0], np.cumsum(brk)))
+    n = int(sid[-1]) + 1 if sid.size else 0
+    first = np.flatnonzero(np.r_[True, brk]); last = np.r_[first[1:] - 1, epoch.size - 1]
+    return {
+        "start": epoch[first], "end": epoch[last],
+        "count": np.bincount(sid, minlength=n),
+        "pnl": np.bincount(sid, weights=r, minlength=n),
+        "wins": np.bincount(sid[r > 0], minlength=n),
+    }
@@ -0,0 +1,152 @@
+import threading, hashlib
+import numpy as np
+
+# Mergeable PnL distribution summaries: a KLL quantile sketch plus central moments, kept per symbol.
+
+class KLL:
+    """KLL quantile sketch; level h holds items of weight 2**h, roughly 3*k items in total."""
+
+    def __init__(self, k: int = 200, seed=None):
+        self.k = k; self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _cap(self, h: int) -> int:
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** (len(self.levels) - 1 - h))))
+
+    def _compress(self):
+        while sum(l.size for l in self.levels) > sum(self._cap(h) for h in range(len(self.levels))):
+            h = next(h for h, l in enumerate(self.levels) if l.size > self._cap(h))
+            if h + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            lvl = np.sort(self.levels[h])
+            odd = lvl.size % 2
+            keep, pairs = lvl[:odd], lvl[odd:]
+            promoted = pairs[int(self._rng.integers(2))::2]
+            self.levels[h] = keep
+            self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+
+    def update(self, values):
+        v = np.asarray(values, dtype=np.float64).ravel()
+        v = v[np.isfinite(v)]
+        if v.size:
+            self.n += v.size
+            self.levels[0] = np.concatenate((self.levels[0], v))
+            self._compress()
+
+    def merge(self, other: "KLL"):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, l in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], l))
+        self.n += other.n
+        self._compress()
+
+    def weighted(self):
+        """(sorted items, weights)."""
+        items = np.concatenate(self.levels)
+        w = np.concatenate([np.full(l.size, 2.0 ** h) for h, l in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], w[order]
+
+    def quantiles(self, qs):
+        items, w = self.weighted()
+        if not items.size:
+            return np.full(len(qs), np.nan)
+        cw = np.cumsum(w)
+        idx = np.searchsorted(cw, np.asarray(qs, dtype=np.float64) * cw[-1], side="left")
+        return items[np.minimum(idx, items.size - 1)]
+
+    def nbytes(self) -> int:
+        return sum(l.nbytes for l in self.levels)
+
+class Moments:
+    """Count, mean and 2nd-4th central moment sums; batches combine with the pairwise (Pebay) update."""
+
+    def __init__(self):
+        self.n = 0; self.mean = 0.0; self.m2 = 0.0; self.m3 = 0.0; self.m4 = 0.0
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64).ravel()
+        x = x[np.isfinite(x)]
+        if not x.size:
+            return
+        b = Moments(); b.n = x.size; b.mean = float(x.mean())
+        d = x - b.mean
+        b.m2 = float(np.dot(d, d)); d3 = d * d * d
+        b.m3 = float(d3.sum()); b.m4 = float(np.dot(d3, d))
+        self.merge(b)
+
+    def merge(self, b: "Moments"):
+        na, nb = self.n, b.n
+        if nb == 0:
+            return
+        if na == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = b.n, b.mean, b.m2, b.m3, b.m4; return
+        n = na + nb; d = b.mean - self.mean
+        m2 = self.m2 + b.m2 + d * d * na * nb / n
+        m3 = (self.m3 + b.m3 + d ** 3 * na * nb * (na - nb) / n ** 2
+              + 3.0 * d * (na * b.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + b.m4 + d ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+              + 6.0 * d * d * (na * na * b.m2 + nb * nb * self.m2) / n ** 2
+              + 4.0 * d * (na * b.m3 - nb * self.m3) / n)
+        self.n = n; self.mean += d * nb / n; self.m2, self.m3, self.m4 = m2, m3, m4
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else 0.0
+
+    @property
+    def skew(self):
+        return float(np.sqrt(self.n) * self.m3 / self.m2 ** 1.5) if self.m2 > 0 else 0.0
+
+    @property
+    def kurtosis(self):
+        # excess kurtosis
+        return float(self.n * self.m4 / (self.m2 * self.m2) - 3.0) if self.m2 > 0 else 0.0
+
+class SketchStore:
+    """Per-symbol (KLL, Moments) for one trades file, fed only the rows appended since the last sync.
+    The whole-file sketch is keyed None, so a symbol literally named ALL keeps its own entry."""
+
+    def __init__(self, k: int = 200):
+        self.k = k; self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, path):
+        self.path = path; self.version = None; self.rows = 0; self.head = hashlib.sha1()
+        self.kll = {}; self.moments = {}
+
+    def _ingest(self, key, values):
+        if key not in self.kll:
+            self.kll[key] = KLL(self.k, seed=len(self.kll)); self.moments[key] = Moments()
+        self.kll[key].update(values); self.moments[key].update(values)
+
+    def sync(self, ds):
+        with self._lock:
+            if ds.path == self.path and ds.version == self.version:
+                return
+            n = len(ds)
+            # an edited or replaced file (not a pure append) invalidates everything; the prefix must match bit for bit
+            if (ds.path != self.path or n < self.rows
+                    or hashlib.sha1(np.ascontiguousarray(ds.pnl[:self.rows])).digest() != self.head.digest()):
+                self._reset(ds.path)
+            self.version = ds.version
+            if n == self.rows:
+                return
+            new = np.ascontiguousarray(ds.pnl[self.rows:])
+            self._ingest(None, new)
+            if ds.scol:
+                codes = ds.sym_codes[self.rows:]
+                order = np.argsort(codes, kind="stable")
+                u, start = np.unique(codes[order], return_index=True)
+                for c, part in zip(u, np.split(new[order], start[1:])):
+                    self._ingest(str(ds.sym_names[c]), part)
+            self.head.update(new); self.rows = n
+
+    def get(self, symbol=None):
+        key = (symbol or "").strip().upper() or None
+        with self._lock:
+            return self.kll.get(key), self.moments.get(key)
+
+SKETCHES = SketchStore()
@@ -0,0 +1,58 @@
+import re
+import numpy as np
+
+# Hypothetical rules applied to the cached PnL array: masks drop trades, costs and caps adjust PnL.
+
+def parse_cost(text: str):
+    """'0.05%' -> ('rate', 0.0005); '2bp' -> ('rate', 0.0002); '0.5' -> ('abs', 0.5) per trade."""
+    t = (text or "").strip().lower()
+    m = re.match(r"^(\d+(?:\.\d+)?)\s*(%|bps?)?$", t)
+    if not m:
+        raise ValueError(f"bad cost '{text}'")
+    v = float(m.group(1)); unit = m.group(2)
+    if unit == "%":
+        return "rate", v / 100.0
+    if unit:
+        return "rate", v / 10000.0
+    return "abs", v
+
+def parse_hours(text: str):
+    """'8-20' -> (8, 20): keep start <= hour < end, wrapping past midnight when start > end."""
+    m = re.match(r"^(\d{1,2})\s*-\s*(\d{1,2})$", (text or "").strip())
+    if not m or int(m.group(1)) > 23 or int(m.group(2)) > 24:
+        raise ValueError(f"bad hours '{text}'")
+    return int(m.group(1)), int(m.group(2))
+
+def apply(ds, mask, args: dict):
+    """(kept mask, adjusted PnL of kept trades, notes). Raises ValueError on malformed rules."""
+    m = mask.copy(); notes = []
+    if args.get("exclude"):
+        drop = {s.strip().upper() for s in args["exclude"].split(",") if s.strip()}
+        codes = np.flatnonzero(np.isin(ds.sym_names.astype(str), list(drop)))
+        m &= ~np.isin(ds.sym_codes, codes)
+        notes.append("exclude " + ",".join(sorted(drop)))
+    if args.get("hours"):
+        lo, hi = parse_hours(args["hours"])
+        h = ds.hour
+        inside = (h >= lo) & (h < hi) if lo <= hi else (h >= lo) | (h < hi)
+        m &= ds.tvalid & inside
+        notes.append(f"hours {lo:02d}-{hi:02d}")
+    r = ds.pnl[m].copy()
+    cost = np.zeros_like(r)
+    for key in ("fee", "slippage"):
+        if not args.get(key):
+            continue
+        kind, v = parse_cost(args[key])
+        if kind == "abs":
+            cost += v
+        else:
+            if ds.notional is None:
+                raise ValueError(f"{key} as %/bp needs qty and price columns; pass an absolute amount instead")
+            cost += v * ds.notional[m]
+        notes.append(f"{key} {args[key]}")
+    r -= cost
+    if args.get("maxloss"):
+        cap = abs(float(args["maxloss"]))
+        np.maximum(r, -cap, out=r)
+        notes.append(f"maxloss {cap:g}")
+    return m, r, notes
@@ -0,0 +1,72 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+import pytest
+from telegram_bot.fills import reconstruct
+
+def _reference(df, method):
+    """Per-symbol loop over fills in time order: FIFO lots in a deque, or a running average price."""
+    out = {}
+    for sym, part in df.sort_values("time", kind="stable").groupby("symbol", sort=False):
+        lots = deque(); pos = 0.0; avg = 0.0
+        for i, q, p in zip(part.index, part["qty"], part["price"]):
+            if pos == 0 or np.sign(q) == np.sign(pos):
+                if method == "fifo":
+                    lots.append([abs(q), p])
+                else:
+                    avg = (abs(pos) * avg + abs(q) * p) / (abs(pos) + abs(q))
+                pos += q; continue
+            c = min(abs(q), abs(pos)); d = np.sign(pos)
+            if method == "fifo":
+                left = c; cost = 0.0
+                while left > 1e-12:
+                    take = min(left, lots[0][0]); cost += take * lots[0][1]
+                    lots[0][0] -= take; left -= take
+                    if lots[0][0] <= 1e-12:
+                        lots.popleft()
+                entry = cost / c
+            else:
+                entry = avg
+            out[i] = (c, entry, d * c * (p - entry))
+            pos += q
+            if abs(q) > c:  # flipped through flat
+                lots = deque([[abs(q) - c, p]]); avg = p
+    return out
+
+def _fills(n, symbols, seed):
+    rng = np.random.default_rng(seed)
+    qty = rng.integers(-5, 6, n).astype(float); qty[qty == 0] = 1.0
+    return pd.DataFrame({
+        "time": pd.Timestamp("2025-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 10**6, n)), unit="s"),
+        "symbol": rng.choice(symbols, n), "qty": qty, "price": rng.uniform(90, 110, n).round(2),
+    })
+
+@pytest.mark.parametrize("method", ["fifo", "avg"])
+def test_reconstruct_matches_loop(method):
+    df = _fills(3000, ["BTC", "ETH", "SOL"], seed=1)
+    closes, _ = reconstruct(df, None, "qty", "price", tcol="time", scol="symbol", method=method)
+    ref = _reference(df, method)
+    exp = pd.DataFrame([ref[i] for i in sorted(ref)], columns=["closed_qty", "entry_price", "realized_pnl"])
+    assert len(closes) == len(exp)
+    for col in exp.columns:
+        np.testing.assert_allclose(closes[col].to_numpy(), exp[col].to_numpy(), rtol=1e-9, atol=1e-8)
+
+def test_closes_keep_fill_order():
+    df = pd.DataFrame({
+        "time": pd.to_datetime(["2025-01-01 01:00", "2025-01-01 02:00", "2025-01-01 05:00", "2025-01-01 07:00"]),
+        "symbol": ["BTC", "ETH", "ETH", "BTC"], "qty": [1.0, 1.0, -1.0, -1.0], "price": [100.0, 10.0, 12.0, 90.0],
+    })
+    closes, _ = reconstruct(df, None, "qty", "price", tcol="time", scol="symbol")
+    assert list(closes["symbol"]) == ["ETH", "BTC"]
+    np.testing.assert_allclose(closes["realized_pnl"], [2.0, -10.0])
+
+def test_avg_cost_survives_repeated_scale_out_in():
+    # regression: scaling out and back in without going flat used to overflow the running product
+    qty = [100.0] + [-99.0, 99.0] * 200
+    df = pd.DataFrame({"time": pd.date_range("2025-01-01", periods=len(qty), freq="min"), "symbol": "BTC",
+                       "qty": qty, "price": 100.0 + np.arange(len(qty)) % 7})
+    closes, positions = reconstruct(df, None, "qty", "price", tcol="time", scol="symbol", method="avg")
+    assert np.isfinite(closes["realized_pnl"]).all() and np.isfinite(closes["entry_price"]).all()
+    ref = _reference(df, "avg")
+    np.testing.assert_allclose(closes["realized_pnl"], [ref[i][2] for i in sorted(ref)], rtol=1e-9, atol=1e-8)
+    assert np.isfinite(positions["avg_cost"]).all() and positions["qty"].iloc[0] == 100.0
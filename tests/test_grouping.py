@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from telegram_bot.grouping import group_stats, top_n, bincount2d
+from telegram_bot.metrics import summarize
+
+KEYS = [("count", "trades"), ("pnl", "pnl"), ("avg", "avg"), ("win_pct", "win_pct"), ("pf", "pf"),
+        ("maxdd", "maxdd"), ("best", "best"), ("worst", "worst")]
+
+@pytest.mark.parametrize("seed,scale", [(0, 1.0), (1, 1e6), (2, 1e-3)])
+def test_group_stats_matches_per_group_summarize(seed, scale):
+    rng = np.random.default_rng(seed)
+    n_groups = 12  # groups 10 and 11 stay empty
+    codes = rng.integers(0, 10, 5000)
+    r = rng.normal(0.1, 1.0, codes.size) * scale
+    r[codes == 3] = -np.abs(r[codes == 3])   # a group that never profits
+    r[codes == 4] = np.abs(r[codes == 4])    # ... and one that never loses
+    st = group_stats(codes, r, n_groups)
+    for g in range(n_groups):
+        ref = summarize(r[codes == g])
+        for key, ref_key in KEYS:
+            np.testing.assert_allclose(st[key][g], ref[ref_key], rtol=1e-9, atol=1e-9 * scale, err_msg=f"{key} group {g}")
+
+def test_top_n_and_bincount2d():
+    vals = np.array([3.0, 9.0, -1.0, 9.0, 5.0])
+    assert list(top_n(vals, 3)) == [1, 3, 4]
+    assert list(top_n(vals, 2, present=np.array([1, 0, 1, 0, 1], bool))) == [4, 0]
+    rows = np.array([0, 1, 1, 2]); cols = np.array([1, 0, 0, 1]); w = np.array([1.0, 2.0, 3.0, 4.0])
+    np.testing.assert_array_equal(bincount2d(rows, cols, 3, 2, w), [[0, 1], [5, 0], [0, 4]])
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+import os
+import pandas as pd
+from telegram_bot.dataset import load_dataset
+from telegram_bot.sketch import KLL, Moments, SketchStore
+
+QS = np.linspace(0.01, 0.99, 99)
+
+def _rank_error(data, est, qs):
+    # normalised rank distance between the sketch answer and the exact quantile
+    s = np.sort(data)
+    lo = np.searchsorted(s, est, side="left") / s.size
+    hi = np.searchsorted(s, est, side="right") / s.size
+    return np.max(np.where(qs < lo, lo - qs, np.where(qs > hi, qs - hi, 0.0)))
+
+def _data(seed, n=200_000):
+    rng = np.random.default_rng(seed)
+    return np.concatenate((rng.standard_t(3, n // 2), rng.exponential(5.0, n - n // 2) - 2.0))
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_kll_quantiles_match_np_quantile(seed):
+    x = _data(seed)
+    sk = KLL(200, seed=seed)
+    for part in np.array_split(x, 37):
+        sk.update(part)
+    assert sk.n == x.size
+    est = sk.quantiles(QS)
+    assert _rank_error(x, est, QS) < 0.02
+    exact = np.quantile(x, QS)
+    np.testing.assert_allclose(est, exact, atol=0.05 * (exact[-1] - exact[0]))
+    assert sk.nbytes() < x.nbytes // 50
+
+def test_kll_merge_matches_np_quantile():
+    x = _data(3)
+    parts = np.array_split(x, 8)
+    merged = KLL(200, seed=0)
+    for i, p in enumerate(parts):
+        s = KLL(200, seed=i + 1); s.update(p); merged.merge(s)
+    assert merged.n == x.size
+    assert _rank_error(x, merged.quantiles(QS), QS) < 0.02
+
+def test_kll_small_input_is_exact():
+    x = np.array([5.0, 1.0, np.nan, 3.0, 2.0, 4.0])
+    sk = KLL(200); sk.update(x)
+    assert sk.n == 5
+    np.testing.assert_array_equal(sk.quantiles([0.0, 0.2, 0.5, 1.0]), [1.0, 1.0, 3.0, 5.0])
+    assert np.isnan(KLL().quantiles([0.5])).all()
+
+def _ref_moments(x):
+    n = x.size; d = x - x.mean()
+    m2, m3, m4 = (d ** 2).sum(), (d ** 3).sum(), (d ** 4).sum()
+    return x.mean(), x.std(ddof=1), np.sqrt(n) * m3 / m2 ** 1.5, n * m4 / m2 ** 2 - 3.0
+
+@pytest.mark.parametrize("offset", [0.0, 1e6])
+def test_moments_batches_and_merge_match_numpy(offset):
+    x = _data(4, 50_000) + offset
+    a = Moments()
+    for part in np.array_split(x, 13):
+        a.update(part)
+    b = Moments()
+    for part in np.array_split(x, 5):
+        m = Moments(); m.update(part); b.merge(m)
+    mean, std, skew, kurt = _ref_moments(x)
+    for m in (a, b):
+        assert m.n == x.size
+        np.testing.assert_allclose([m.mean, m.std, m.skew, m.kurtosis], [mean, std, skew, kurt], rtol=1e-7)
+
+def test_moments_single_values():
+    m = Moments()
+    for v in [2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0]:
+        m.update([v])
+    mean, std, skew, kurt = _ref_moments(np.array([2.0, 4.0, 4.0, 4.0, 5.0, 5.0, 7.0, 9.0]))
+    np.testing.assert_allclose([m.mean, m.std, m.skew, m.kurtosis], [mean, std, skew, kurt], rtol=1e-12)
+    e = Moments(); e.update([np.nan])
+    assert (e.n, e.std, e.skew, e.kurtosis) == (0, 0.0, 0.0, 0.0)
+
+def _write(path, profit, symbol, bump=0):
+    pd.DataFrame({"symbol": symbol, "profit": profit}).to_csv(path, index=False)
+    st = os.stat(path); os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump))
+
+def test_sketch_store_appends_and_edits(tmp_path):
+    path = str(tmp_path / "trades.csv")
+    profit = np.full(1000, 1000.0); symbol = np.where(np.arange(1000) % 2, "ALL", "BTC")
+    _write(path, profit, symbol)
+    store = SketchStore()
+    store.sync(load_dataset(path))
+    assert store.get()[1].n == 1000 and store.get("all")[1].n == 500 and store.get("BTC")[1].n == 500
+
+    # pure append: only the new rows are ingested
+    _write(path, np.append(profit, 7.0), np.append(symbol, "ETH"), bump=10**9)
+    store.sync(load_dataset(path))
+    assert store.get()[1].n == 1001 and store.get("eth")[1].n == 1 and store.get("ALL")[1].n == 500
+
+    # same row count, one trade edited by a tiny relative amount: rebuilt from scratch
+    profit[3] = 995.0
+    _write(path, profit, symbol, bump=2 * 10**9)
+    store.sync(load_dataset(path))
+    mom = store.get()[1]
+    assert mom.n == 1000 and store.get("ETH") == (None, None)
+    np.testing.assert_allclose(mom.mean, profit.mean(), rtol=1e-12)
@@ -34,7 +34,8 @@ def analyze_backtest(file_path):
     total_trades = len(df)
     total_profit = df['profit'].sum()
     win_rate = (df['profit'] > 0).mean() * 100
-    max_drawdown = df['profit'].cumsum().min()
+    equity = df['profit'].cumsum()
+    max_drawdown = (equity - equity.cummax().clip(lower=0)).min()
     best_trade = df['profit'].max()
     worst_trade = df['profit'].min()
 
@@ -1,39 +1,184 @@
+import os, time, threading, queue
+from collections import deque
+_T0 = time.perf_counter()
+from flask import Flask, request, jsonify
 
-import os
-from flask import Flask, request
-from telegram import Bot, Update
-from telegram.ext import Dispatcher
-from telegram.utils.request import Request
-from telegram_bot import register_handlers, start_scheduler
-
-TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 APP_TOKEN_IN_PATH = os.environ.get("APP_TOKEN_IN_PATH", "0") == "1"
+PREWARM = os.environ.get("PREWARM", "1") == "1"   # 0 = leave matplotlib to the first in-process chart
+TELEGRAM_POOL_SIZE = int(os.environ.get("TELEGRAM_POOL_SIZE", "8"))
+UPDATE_WORKERS = int(os.environ.get("UPDATE_WORKERS", "4"))   # 0 = process updates inside the request
+UPDATE_QUEUE_SIZE = int(os.environ.get("UPDATE_QUEUE_SIZE", "100"))
+
+def _token():
+    return os.environ.get("TELEGRAM_BOT_TOKEN")
+
+# Cold start: the bot package (pandas, numpy, apscheduler, python-telegram-bot) is imported and its scheduler
+# started by a background thread at boot, so "/" and "/health" answer as soon as Flask is up and the daily
+# digest runs even if nobody messages the bot.
+STARTUP = {"timings_ms": {}, "ready": False, "error": None}
+_BOT_LOCK = threading.Lock()
+_BOT = None
+
+def _ms(t):
+    return round((time.perf_counter() - t) * 1000.0, 1)
+
+def _bot_module():
+    global _BOT
+    with _BOT_LOCK:
+        if _BOT is None:
+            t = time.perf_counter()
+            import telegram_bot
+            STARTUP["timings_ms"]["import_telegram_bot"] = _ms(t)
+            t = time.perf_counter()
+            try:
+                telegram_bot.start_scheduler()
+            except Exception as e:
+                print("Scheduler start warning:", e)
+            STARTUP["timings_ms"]["start_scheduler"] = _ms(t)
+            STARTUP["timings_ms"]["ready_after_start"] = _ms(_T0)
+            STARTUP["ready"] = True
+            _BOT = telegram_bot
+        return _BOT
 
-try:
-    start_scheduler()
-except Exception as e:
-    print("Scheduler start warning:", e)
+def _boot():
+    try:
+        _bot_module()
+        if PREWARM:
+            t = time.perf_counter()
+            import matplotlib.figure, matplotlib.backends.backend_agg  # in-process charts (/montecarlo, /holding, ...)
+            STARTUP["timings_ms"]["import_matplotlib"] = _ms(t)
+    except Exception as e:
+        STARTUP["error"] = repr(e); print("Startup warning:", e)
+
+# One Bot (and its HTTPS connection pool) + Dispatcher per process, shared by all request threads;
+# rebuilt only when TELEGRAM_BOT_TOKEN changes.
+_RT_LOCK = threading.Lock()
+_RT = {"token": None, "bot": None, "request": None, "dispatcher": None, "builds": 0, "updates": 0}
+
+def _runtime():
+    token = _token()
+    rt = _RT
+    if rt["dispatcher"] is None or rt["token"] != token:
+        with _RT_LOCK:
+            if rt["dispatcher"] is None or rt["token"] != token:
+                tb = _bot_module()
+                from telegram import Bot
+                from telegram.ext import Dispatcher
+                from telegram.utils.request import Request
+                old = rt["dispatcher"]
+                req = Request(con_pool_size=TELEGRAM_POOL_SIZE)
+                bot = Bot(token=token, request=req)
+                dispatcher = Dispatcher(bot=bot, update_queue=None, workers=4, use_context=True)
+                tb.register_handlers(dispatcher)
+                rt.update(token=token, bot=bot, request=req, dispatcher=dispatcher, builds=rt["builds"] + 1)
+                if old is not None:
+                    try:
+                        old.stop()
+                    except Exception as e:
+                        print("Dispatcher stop warning:", e)
+    return rt["bot"], rt["dispatcher"]
+
+def _pool_stats():
+    """HTTPS connections opened vs requests sent through the shared Bot's urllib3 pools."""
+    req = _RT["request"]
+    conns = reqs = 0
+    if req is not None:
+        pools = req._con_pool.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                conns += pool.num_connections; reqs += pool.num_requests
+    return {"builds": _RT["builds"], "updates": _RT["updates"], "connections_opened": conns, "requests": reqs,
+            "reused_pct": round(100.0 * (reqs - conns) / reqs, 1) if reqs else 0.0, "pool_size": TELEGRAM_POOL_SIZE}
+
+# Webhook updates are acknowledged at once and handled by a small worker pool draining a bounded queue,
+# so slow commands never hold gunicorn threads or trigger Telegram's webhook retries.
+_UPDATES = queue.Queue(maxsize=UPDATE_QUEUE_SIZE)
+_Q_LOCK = threading.Lock()
+_Q = {"started": False, "enqueued": 0, "processed": 0, "failed": 0, "rejected": 0, "max_depth": 0, "waits": deque(maxlen=500)}
+
+def _process(body):
+    bot, dispatcher = _runtime()
+    from telegram import Update
+    update = Update.de_json(body, bot)
+    _RT["updates"] += 1
+    dispatcher.process_update(update)
+
+def _update_worker():
+    while True:
+        body, t_in = _UPDATES.get()
+        wait = time.perf_counter() - t_in
+        try:
+            _process(body)
+            ok = True
+        except Exception as e:
+            ok = False; print("Update worker error:", e)
+        finally:
+            _UPDATES.task_done()
+        with _Q_LOCK:
+            _Q["waits"].append(wait)
+            _Q["processed" if ok else "failed"] += 1
+
+def _start_workers():
+    with _Q_LOCK:
+        if _Q["started"]:
+            return
+        _Q["started"] = True
+    for i in range(UPDATE_WORKERS):
+        threading.Thread(target=_update_worker, name=f"update-worker-{i}", daemon=True).start()
+
+def _enqueue(body) -> bool:
+    _start_workers()
+    try:
+        _UPDATES.put_nowait((body, time.perf_counter()))
+    except queue.Full:
+        with _Q_LOCK:
+            _Q["rejected"] += 1
+        return False
+    with _Q_LOCK:
+        _Q["enqueued"] += 1; _Q["max_depth"] = max(_Q["max_depth"], _UPDATES.qsize())
+    return True
+
+def _queue_stats():
+    with _Q_LOCK:
+        waits = sorted(_Q["waits"])
+        st = {k: v for k, v in _Q.items() if k not in ("waits", "started")}
+    pct = lambda q: round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000.0, 1) if waits else 0.0
+    return dict(st, workers=UPDATE_WORKERS, depth=_UPDATES.qsize(), capacity=UPDATE_QUEUE_SIZE,
+                wait_ms_p50=pct(0.5), wait_ms_p95=pct(0.95), wait_ms_max=round(waits[-1] * 1000.0, 1) if waits else 0.0)
 
 app = Flask(__name__)
+STARTUP["timings_ms"]["wsgi_import"] = _ms(_T0)
+threading.Thread(target=_boot, name="boot", daemon=True).start()
 
 @app.route("/", methods=["GET"])
 def index():
-    if not TELEGRAM_BOT_TOKEN:
+    if not _token():
         return "<h1>TrustMe AI Bot ⚠️</h1><p>Set TELEGRAM_BOT_TOKEN in Railway Variables.</p>", 200
     return "<h1>TrustMe AI Bot ✅</h1><p>Webhook endpoint is /webhook{opt}</p>".format(
         opt="/<TOKEN>" if APP_TOKEN_IN_PATH else ""
     ), 200
 
+@app.route("/health", methods=["GET"])
+def health():
+    return jsonify({
+        "status": "ok" if STARTUP["ready"] else "warming",
+        "uptime_s": round(time.perf_counter() - _T0, 1),
+        "prewarm": PREWARM,
+        "startup": STARTUP,
+        "telegram_pool": _pool_stats(),
+        "update_queue": _queue_stats(),
+    }), 200
+
 def _handle_webhook():
     body = request.get_json(force=True, silent=True)
-    if not body:
+    if not isinstance(body, dict) or "update_id" not in body:
         return "no json", 400
-    req = Request(con_pool_size=8)
-    bot = Bot(token=TELEGRAM_BOT_TOKEN, request=req)
-    dispatcher = Dispatcher(bot=bot, update_queue=None, workers=4, use_context=True)
-    register_handlers(dispatcher)
-    update = Update.de_json(body, bot)
-    dispatcher.process_update(update)
+    if UPDATE_WORKERS <= 0:
+        _process(body)
+        return "OK", 200
+    if not _enqueue(body):
+        return "busy", 503  # Telegram retries the update later
     return "OK", 200
 
 @app.route("/webhook", methods=["POST"])
@@ -45,6 +190,6 @@ def webhook():
 @app.route("/webhook/<path_token>", methods=["POST"])
 def webhook_tokened(path_token):
     if APP_TOKEN_IN_PATH:
-        if not TELEGRAM_BOT_TOKEN or path_token != TELEGRAM_BOT_TOKEN:
+        if not _token() or path_token != _token():
             return "forbidden", 403
     return _handle_webhook()